@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.profiling import is_admin_token, profile_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_profile_token: Optional[str] = Header(None)):
+    """Allow only requests carrying the admin profiling token"""
+    if not is_admin_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """List stored pipeline profiles, newest first"""
+    return [profile.summary() for profile in profile_store.list()]
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: str):
+    """Get a stored pipeline profile with its call-stack statistics"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return {**profile.summary(), "stats": profile.stats}
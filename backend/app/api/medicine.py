@@ -1,21 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import hashlib
+import json
 import os
+import re
 import tempfile
+import threading
 import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.dependencies import get_current_user, get_db
+from app.dependencies import get_current_user
+from app.services.visit_counter import visit_counter
 from app.core.config import settings
+from app.core.profiling import profile_pipeline, should_profile
 from app.schemas.user import UserOut
-from app.schemas.medicine import MedicineExtractionResponse, ExtractedMedicine
-from extract import process_file
+from app.schemas.medicine import (
+    ExtractionDepth,
+    MedicineExtractionResponse,
+    ExtractedMedicine,
+    MedicineDetailsResponse,
+    MedicineDetailsBulkRequest,
+    MedicineDetailsBulkResponse,
+)
+from nlp.rxnorm_details import RxNormDetailsValidator
 
 router = APIRouter(prefix="/medicine", tags=["medicine"])
 
 # Chunk size for streaming (64KB)
 CHUNK_SIZE = 64 * 1024
 
+RXCUI_PATTERN = re.compile(r"^\d{1,10}$")
+
+
+def process_file(file_path: str, **kwargs):
+    """Run the extraction pipeline; imported on first use so cv2/numpy stay out of worker startup"""
+    from extract import process_file as run_extraction_pipeline
+    from ocr.quality import ImageQualityError
+    try:
+        return run_extraction_pipeline(file_path, **kwargs)
+    except ImageQualityError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+
+
+@dataclass
+class ExtractionOptions:
+    depth: ExtractionDepth
+    include: Optional[Dict[str, Any]]  # model_dump include spec built from fields=, None for everything
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Turn a fields= projection such as "medicines.matched_name,total_medicines_found"
+    into a model_dump include spec.
+    """
+    if not fields:
+        return None
+
+    include: Dict[str, Any] = {}
+    for field_path in filter(None, (part.strip() for part in fields.split(","))):
+        name, _, sub_name = field_path.partition(".")
+        if name not in MedicineExtractionResponse.model_fields:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown field: {name}")
+        if not sub_name:
+            include[name] = True
+            continue
+        if name != "medicines" or sub_name not in ExtractedMedicine.model_fields:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown field: {field_path}")
+        if include.get(name) is not True:
+            include.setdefault(name, {"__all__": set()})["__all__"].add(sub_name)
+    return include or None
+
+
+def get_extraction_options(
+        depth: ExtractionDepth = Query(
+            ExtractionDepth.FULL,
+            description="Pipeline depth: names, validated, details (no interactions) or full"
+        ),
+        include_details: Optional[bool] = Query(
+            None, deprecated=True, description="false is equivalent to depth=validated"
+        ),
+        fields: Optional[str] = Query(
+            None, description="Comma-separated response fields, e.g. medicines.matched_name,total_medicines_found"
+        )
+) -> ExtractionOptions:
+    """Query parameters shared by the extraction endpoints"""
+    if include_details is False and depth in (ExtractionDepth.DETAILS, ExtractionDepth.FULL):
+        depth = ExtractionDepth.VALIDATED
+    return ExtractionOptions(depth=depth, include=parse_fields(fields))
+
+
+def project_response(extraction_response: MedicineExtractionResponse, options: ExtractionOptions) -> dict:
+    """Dump a response, keeping only the fields requested with fields="""
+    return extraction_response.model_dump(mode="json", include=options.include)
+
 
 def validate_file(file: UploadFile) -> bool:
     """Validate uploaded file"""
@@ -28,11 +112,104 @@ def validate_file(file: UploadFile) -> bool:
     return True
 
 
+def file_too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
+    )
+
+
+def create_temp_file(suffix: str):
+    """Create a named temporary file in the upload directory"""
+    # Create temp directory if it doesn't exist
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    return tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.UPLOAD_DIR)
+
+
+def remove_temp_file(temp_file_path: Optional[str]):
+    """Delete a temporary file, logging instead of raising on failure"""
+    if temp_file_path and os.path.exists(temp_file_path):
+        try:
+            os.unlink(temp_file_path)
+        except Exception as e:
+            print(f"Warning: Could not delete temp file {temp_file_path}: {e}")
+
+
+async def save_upload(file: UploadFile) -> str:
+    """Stream an upload to a temporary file, enforcing MAX_FILE_SIZE, and return its path"""
+    temp_file_path = None
+    try:
+        with create_temp_file(Path(file.filename).suffix.lower()) as temp_file:
+            temp_file_path = temp_file.name
+
+            # Stream file content in chunks to avoid loading entire file in memory
+            total_size = 0
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                # Check file size limit
+                total_size += len(chunk)
+                if total_size > settings.MAX_FILE_SIZE:
+                    raise file_too_large_error()
+
+                temp_file.write(chunk)
+        return temp_file_path
+    except Exception:
+        remove_temp_file(temp_file_path)
+        raise
+
+
+def to_extracted_medicine(med_data: dict) -> ExtractedMedicine:
+    """Map a pipeline medicine dict onto the response schema"""
+    return ExtractedMedicine(
+        original_name=med_data.get("original", ""),
+        matched_name=med_data.get("matched", ""),
+        confidence_score=med_data.get("score", 0),
+        rxnorm_validated=med_data.get("rxnorm_validated", False),
+        rxcui=med_data.get("rxcui", ""),
+        rxnorm_score=med_data.get("rxnorm_score", 0.0),
+        # Medicines without a "details" key come from runs that skipped the details stage
+        details=(med_data.get("details") or {}) if "details" in med_data else None
+    )
+
+
+def build_extraction_response(extracted_text, detailed_medicines, processing_time: float) -> MedicineExtractionResponse:
+    """Turn process_file output into a response, raising 422 when nothing usable was extracted"""
+    print("DEBUG: extracted_text length =", len(extracted_text or ""))
+    print("DEBUG: detailed_medicines =", detailed_medicines)
+
+    if not extracted_text:
+        raise HTTPException(422, "No text could be extracted from the PDF/DOCX.")
+
+    if detailed_medicines is None:
+        raise HTTPException(422, "Internal error during medicine-detail lookup.")
+
+    if detailed_medicines == []:
+        # Perhaps change to a 200 with an empty list, or a clear 422
+        raise HTTPException(422, "No medicines were recognized in the document.")
+
+    # Format the response
+    medicines = [to_extracted_medicine(med_data) for med_data in detailed_medicines]
+
+    return MedicineExtractionResponse(
+        success=True,
+        message="Medicine extraction completed successfully",
+        extracted_text=extracted_text,
+        medicines=medicines,
+        processing_time=round(processing_time, 2),
+        total_medicines_found=len([m for m in medicines if m.matched_name])
+    )
+
+
 @router.post("/extract", response_model=MedicineExtractionResponse)
 async def extract_medicines(
+        response: Response,
         file: UploadFile = File(...),
         current_user: UserOut = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        x_profile_token: Optional[str] = Header(None),
+        options: ExtractionOptions = Depends(get_extraction_options)
 ):
     """Extract medicine information from uploaded prescription image"""
 
@@ -46,81 +223,33 @@ async def extract_medicines(
     # Create temporary file
     temp_file_path = None
     try:
-        # Create temp directory if it doesn't exist
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=Path(file.filename).suffix.lower(),
-                dir=settings.UPLOAD_DIR
-        ) as temp_file:
-            temp_file_path = temp_file.name
-
-            # Stream file content in chunks to avoid loading entire file in memory
-            total_size = 0
-            while True:
-                chunk = await file.read(CHUNK_SIZE)
-                if not chunk:
-                    break
+        temp_file_path = await save_upload(file)
 
-                # Check file size limit
-                total_size += len(chunk)
-                if total_size > settings.MAX_FILE_SIZE:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
-                    )
+        # Process the file using your extraction pipeline, profiling sampled or admin-requested runs
+        profiler = profile_pipeline(file.filename) if should_profile(x_profile_token) else nullcontext()
 
-                temp_file.write(chunk)
+        def run_pipeline():
+            # Profiling is per thread, so it has to wrap the pipeline inside the worker thread
+            with profiler as pipeline_profile:
+                return process_file(temp_file_path, depth=options.depth, owner=current_user.id), pipeline_profile
 
-        # Process the file using your extraction pipeline
         start_time = time.time()
-        extracted_text, detailed_medicines = process_file(
-            temp_file_path,
-        )
+        (extracted_text, detailed_medicines), profile = await run_in_threadpool(run_pipeline)
         processing_time = time.time() - start_time
+        if profile is not None:
+            response.headers["X-Profile-Id"] = profile.id
 
-        print("DEBUG: extracted_text length =", len(extracted_text or ""))
-        print("DEBUG: detailed_medicines =", detailed_medicines)
-
-        if not extracted_text:
-            raise HTTPException(422, "No text could be extracted from the PDF/DOCX.")
-
-        if detailed_medicines is None:
-            raise HTTPException(422, "Internal error during medicine-detail lookup.")
-
-        if detailed_medicines == []:
-            # Perhaps change to a 200 with an empty list, or a clear 422
-            raise HTTPException(422, "No medicines were recognized in the document.")
-
-        # Format the response
-        medicines = []
-        for med_data in detailed_medicines:
-            details = med_data.get("details") or {}
-            medicine = ExtractedMedicine(
-                original_name=med_data.get("original", ""),
-                matched_name=med_data.get("matched", ""),
-                confidence_score=med_data.get("score", 0),
-                rxnorm_validated=med_data.get("rxnorm_validated", False),
-                rxcui=med_data.get("rxcui", ""),
-                rxnorm_score=med_data.get("rxnorm_score", 0.0),
-                details=details
-            )
-            medicines.append(medicine)
+        extraction_response = build_extraction_response(extracted_text, detailed_medicines, processing_time)
 
         # Update user visit count (optional)
-        current_user.visits += 1
-        db.commit()
-
-        return MedicineExtractionResponse(
-            success=True,
-            message="Medicine extraction completed successfully",
-            extracted_text=extracted_text,
-            medicines=medicines,
-            processing_time=round(processing_time, 2),
-            total_medicines_found=len([m for m in medicines if m.matched_name])
-        )
+        visit_counter.increment(current_user.id)
+
+        if options.include is None:
+            return extraction_response
+        projected = JSONResponse(content=project_response(extraction_response, options))
+        if profile is not None:
+            projected.headers["X-Profile-Id"] = profile.id
+        return projected
 
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -133,8 +262,329 @@ async def extract_medicines(
 
     finally:
         # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
+        remove_temp_file(temp_file_path)
+
+
+def extract_zip_members(zip_path: str, max_files: int) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Unpack supported files from a zip archive into temporary files.
+
+    Returns:
+        list: (file name, temp file path or None, error message or None) per member
+    """
+    entries = []
+    accepted = 0
+    with zipfile.ZipFile(zip_path) as archive:
+        for member in archive.infolist():
+            if member.is_dir():
+                continue
+            name = member.filename
+            if Path(name).suffix.lower() not in settings.ALLOWED_EXTENSIONS:
+                entries.append((name, None, "Invalid file type"))
+                continue
+            if accepted >= max_files:
+                entries.append((name, None, f"Batch limit of {max_files} files exceeded"))
+                continue
+            if member.file_size > settings.MAX_FILE_SIZE:
+                entries.append((name, None, file_too_large_error().detail))
+                continue
+
+            with archive.open(member) as source, create_temp_file(Path(name).suffix.lower()) as target:
+                temp_file_path = target.name
+                # Copy at most MAX_FILE_SIZE + 1 bytes so a forged header cannot inflate past the limit
+                total_size = 0
+                while total_size <= settings.MAX_FILE_SIZE:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    total_size += len(chunk)
+                    target.write(chunk)
+            if total_size > settings.MAX_FILE_SIZE:
+                remove_temp_file(temp_file_path)
+                entries.append((name, None, file_too_large_error().detail))
+                continue
+            entries.append((name, temp_file_path, None))
+            accepted += 1
+    return entries
+
+
+def count_accepted(entries: List[Tuple[str, Optional[str], Optional[str]]]) -> int:
+    """Number of batch entries with a saved file, i.e. not already rejected"""
+    return sum(1 for _, temp_file_path, _ in entries if temp_file_path is not None)
+
+
+def extract_one(file_name: str, temp_file_path: Optional[str], error: Optional[str],
+                depth: ExtractionDepth = ExtractionDepth.FULL, owner=None) -> MedicineExtractionResponse:
+    """Run the extraction pipeline for one batch entry; failures become unsuccessful responses"""
+    start_time = time.time()
+    try:
+        if error:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, error)
+        extracted_text, detailed_medicines = process_file(temp_file_path, depth=depth, owner=owner)
+        extraction_response = build_extraction_response(
+            extracted_text, detailed_medicines, time.time() - start_time
+        )
+    except HTTPException as e:
+        extraction_response = MedicineExtractionResponse(
+            success=False,
+            message=str(e.detail),
+            extracted_text="",
+            medicines=[],
+            processing_time=round(time.time() - start_time, 2),
+            total_medicines_found=0
+        )
+    except Exception as e:
+        extraction_response = MedicineExtractionResponse(
+            success=False,
+            message=f"Error processing image: {str(e)}",
+            extracted_text="",
+            medicines=[],
+            processing_time=round(time.time() - start_time, 2),
+            total_medicines_found=0
+        )
+    finally:
+        remove_temp_file(temp_file_path)
+
+    extraction_response.file_name = file_name
+    return extraction_response
+
+
+@router.post("/extract/batch")
+async def extract_medicines_batch(
+        files: List[UploadFile] = File(...),
+        current_user: UserOut = Depends(get_current_user),
+        options: ExtractionOptions = Depends(get_extraction_options)
+):
+    """
+    Extract medicines from multiple prescriptions, or a zip archive of them.
+
+    Files are processed concurrently (at most BATCH_MAX_WORKERS at a time) and
+    one NDJSON line of MedicineExtractionResponse is streamed per file as soon
+    as it finishes, so results arrive in completion order, not upload order.
+    """
+    # Uploads must be saved before streaming starts; they are closed once the handler returns
+    entries = []
+    try:
+        for file in files:
+            suffix = Path(file.filename).suffix.lower()
+            if suffix != ".zip" and not validate_file(file):
+                entries.append((file.filename, None, "Invalid file type"))
+                continue
+            if suffix != ".zip" and count_accepted(entries) >= settings.BATCH_MAX_FILES:
+                entries.append((file.filename, None, f"Batch limit of {settings.BATCH_MAX_FILES} files exceeded"))
+                continue
             try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                print(f"Warning: Could not delete temp file {temp_file_path}: {e}")
\ No newline at end of file
+                temp_file_path = await save_upload(file)
+            except HTTPException as e:
+                entries.append((file.filename, None, str(e.detail)))
+                continue
+            if suffix != ".zip":
+                entries.append((file.filename, temp_file_path, None))
+                continue
+            try:
+                remaining = max(0, settings.BATCH_MAX_FILES - count_accepted(entries))
+                entries.extend(await run_in_threadpool(extract_zip_members, temp_file_path, remaining))
+            except zipfile.BadZipFile:
+                entries.append((file.filename, None, "Invalid zip archive"))
+            finally:
+                remove_temp_file(temp_file_path)
+    except Exception:
+        for _, temp_file_path, _ in entries:
+            remove_temp_file(temp_file_path)
+        raise
+
+    # Update user visit count once per batch
+    visit_counter.increment(current_user.id)
+
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_WORKERS))
+
+    async def run_entry(entry):
+        started = False
+        try:
+            async with semaphore:
+                started = True
+                return await run_in_threadpool(extract_one, *entry, options.depth, current_user.id)
+        except asyncio.CancelledError:
+            # A started entry keeps running in its worker thread, and extract_one removes its file
+            if not started:
+                remove_temp_file(entry[1])
+            raise
+
+    async def stream_results():
+        tasks = [asyncio.create_task(run_entry(entry)) for entry in entries]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                extraction_response = await next_done
+                # file_name and success always identify the line, whatever fields= asks for
+                line = project_response(extraction_response, options)
+                line.update(file_name=extraction_response.file_name, success=extraction_response.success)
+                yield json.dumps(line) + "\n"
+        finally:
+            # Client went away: drop queued work and its temp files
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+class StreamClosed(Exception):
+    """Raised from a pipeline stage callback once the client has left the event stream"""
+
+
+def format_sse(event: str, payload) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@router.post("/extract/stream")
+async def extract_medicines_stream(
+        file: UploadFile = File(...),
+        current_user: UserOut = Depends(get_current_user),
+        options: ExtractionOptions = Depends(get_extraction_options)
+):
+    """
+    Extract medicines and stream progress as Server-Sent Events.
+
+    Events, each carrying the partial result available at that point:
+        ocr_text: {"extracted_text"}
+        medicines_extracted: {"medicines": [{"name", "position"}]}
+        medicine_validated: one ExtractedMedicine (without details) per medicine
+        medicine_details: one ExtractedMedicine with details per medicine
+        result: the full MedicineExtractionResponse
+        error: {"status_code", "detail"}
+    """
+    # Validate file
+    if not validate_file(file):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+
+    # Uploads must be saved before streaming starts; they are closed once the handler returns
+    temp_file_path = await save_upload(file)
+
+    # Update user visit count (optional)
+    visit_counter.increment(current_user.id)
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stream_closed = threading.Event()
+
+    def on_event(event, payload):
+        # Stop at the next stage boundary rather than pay for OCR, LLM and RxNav calls nobody reads
+        if stream_closed.is_set():
+            raise StreamClosed()
+        if event == "medicines_extracted":
+            payload = {"medicines": [
+                {"name": med.get("matched", ""), "position": med.get("position")}
+                for med in payload["medicines"]
+            ]}
+        elif event in ("medicine_validated", "medicine_details"):
+            payload = to_extracted_medicine(payload).model_dump()
+        loop.call_soon_threadsafe(queue.put_nowait, format_sse(event, payload))
+
+    def run_pipeline() -> str:
+        start_time = time.time()
+        try:
+            extracted_text, detailed_medicines = process_file(
+                temp_file_path, on_event=on_event, depth=options.depth, owner=current_user.id
+            )
+            extraction_response = build_extraction_response(
+                extracted_text, detailed_medicines, time.time() - start_time
+            )
+            return format_sse("result", project_response(extraction_response, options))
+        except StreamClosed:
+            print(f"Client left the event stream, stopped processing {temp_file_path}")
+            return None
+        except HTTPException as e:
+            return format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            return format_sse("error", {
+                "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "detail": f"Error processing image: {str(e)}"
+            })
+        finally:
+            remove_temp_file(temp_file_path)
+
+    async def stream_events():
+        pipeline = asyncio.ensure_future(run_in_threadpool(run_pipeline))
+        pipeline.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            # Stage events are queued by the worker thread before it finishes, so they precede the sentinel
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                yield message
+            yield await pipeline
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            stream_closed.set()
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def cacheable_json_response(request: Request, content: dict, cacheable: bool = True) -> Response:
+    """JSON response with a content-hash ETag; answers 304 when the client's copy is current"""
+    body = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    if not cacheable:
+        # Partial results from an RxNav outage must not be kept by clients or proxies
+        return JSONResponse(content=json.loads(body), headers={"Cache-Control": "no-store"})
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.DETAILS_HTTP_MAX_AGE}"
+    }
+
+    client_etags = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=json.loads(body), headers=headers)
+
+
+def validate_rxcui(rxcui: str) -> str:
+    if not RXCUI_PATTERN.match(rxcui):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid RxCUI: {rxcui}")
+    return rxcui
+
+
+@router.get("/details/{rxcui}", response_model=MedicineDetailsResponse)
+async def get_medicine_details(
+        rxcui: str,
+        request: Request,
+        current_user: UserOut = Depends(get_current_user)
+):
+    """Get detailed RxNorm information for one medicine, with ETag/Cache-Control headers"""
+    validate_rxcui(rxcui)
+    details, complete = await run_in_threadpool(RxNormDetailsValidator().fetch_medicine_details, rxcui)
+    content = MedicineDetailsResponse(rxcui=rxcui, details=details).model_dump()
+    return cacheable_json_response(request, content, cacheable=complete)
+
+
+@router.post("/details:bulk", response_model=MedicineDetailsBulkResponse)
+async def get_medicine_details_bulk(
+        body: MedicineDetailsBulkRequest,
+        request: Request,
+        current_user: UserOut = Depends(get_current_user)
+):
+    """Get detailed RxNorm information for several medicines in one call"""
+    rxcuis = list(dict.fromkeys(validate_rxcui(rxcui) for rxcui in body.rxcuis))
+    if len(rxcuis) > settings.DETAILS_BULK_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.DETAILS_BULK_MAX} RxCUIs per request"
+        )
+
+    def fetch_all():
+        validator = RxNormDetailsValidator()
+        with ThreadPoolExecutor(max_workers=max(1, settings.DETAILS_BULK_WORKERS)) as executor:
+            return dict(zip(rxcuis, executor.map(validator.fetch_medicine_details, rxcuis)))
+
+    results = await run_in_threadpool(fetch_all)
+    details = {rxcui: result[0] for rxcui, result in results.items()}
+    content = MedicineDetailsBulkResponse(details=details).model_dump()
+    return cacheable_json_response(request, content, cacheable=all(result[1] for result in results.values()))
@@ -4,23 +4,99 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     FRONTEND_URL: str
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a pooled connection is replaced
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a pooled connection
+    DB_CREATE_SCHEMA: bool = True  # Create missing tables at startup; disable when migrations own the schema
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    USER_CACHE_TTL_SECONDS: int = 60  # How long an authenticated user snapshot is reused
+    USER_CACHE_MAX_SIZE: int = 10000
+    VISIT_FLUSH_INTERVAL_SECONDS: float = 5.0  # How often buffered visit counts are written
 
     # OCR Service Settings
-    AZURE_SUBSCRIPTION_KEY: str
-    AZURE_ENDPOINT: str
+    OCR_BACKEND: str = "azure"  # "azure", "tesseract" or "auto" (Azure, Tesseract while Azure is slow)
+    OCR_AZURE_LATENCY_THRESHOLD: float = 8.0  # Seconds; "auto" routes to Tesseract above this
+    OCR_AZURE_PROBE_INTERVAL: float = 30.0  # Seconds between Azure probes while routed away
+    TESSERACT_LANG: str = "eng"
+    OCR_PHASH_CACHE_SIZE: int = 500  # Recent images whose OCR text is reused for near-duplicate uploads (~16KB each)
+    OCR_PHASH_MAX_DISTANCE: int = 16  # Differing hash bits (of 256) for a candidate match; below 32
+    OCR_PHASH_SIGNATURE_TEXT_HEIGHT: int = 24  # Text height (px) sheets are compared at
+    OCR_PHASH_MAX_INK_DIFFERENCE: int = 20  # Unmatched ink pixels allowed in any 32px tile to confirm a match
+    QUALITY_GATE_ENABLED: bool = True  # Reject unreadable images with a 422 before any upstream call
+    QUALITY_MIN_SIDE: int = 300  # Pixels; shorter image sides cannot hold readable prescription text
+    QUALITY_MIN_HIGHLIGHT: float = 60.0  # Too dark if even the brightest 1% of the thumbnail is below this gray level (0-255)
+    QUALITY_MAX_SHADOW: float = 200.0  # Washed out if even the darkest 0.1% (the ink) is above this gray level
+    QUALITY_MIN_EDGE_DENSITY: float = 0.001  # Fraction of thumbnail pixels on edges; blank pages score ~0
+    QUALITY_MIN_SHARPNESS: float = 15.0  # Variance of the thumbnail's Laplacian; sharp pages score in the hundreds
+    DOCUMENT_CROP_ENABLED: bool = True  # Crop photos to the detected sheet and straighten it before enhancement
+    DOCUMENT_MIN_AREA_RATIO: float = 0.2  # Smallest sheet, as a fraction of the frame, accepted as the document
+    DOCUMENT_MAX_AREA_RATIO: float = 0.95  # Sheets covering more of the frame are left uncropped
+    DOCUMENT_MIN_SKEW: float = 1.0  # Degrees; smaller text rotation is left alone (and is within estimate noise)
+    DOCUMENT_MAX_SKEW: float = 15.0  # Degrees; largest text rotation searched for and corrected
+    AZURE_SUBSCRIPTION_KEY: str = ""
+    AZURE_ENDPOINT: str = ""
+    AZURE_READ_TIMEOUT: float = 60.0  # Hard deadline per Read call (submit + polling), seconds
+    AZURE_READ_MIN_POLL_INTERVAL: float = 0.25
+    AZURE_READ_MAX_POLL_INTERVAL: float = 5.0
+    AZURE_READ_POOL_SIZE: int = 10  # Keep-alive connections held by the shared Read client
+    AZURE_PDF_PAGES_PER_REQUEST: int = 4  # Pages per concurrent Read operation for scanned PDFs
+    AZURE_PDF_MAX_CONCURRENCY: int = 4  # Concurrent Read operations per PDF
 
     # OpenRouter API Settings
     OPENROUTER_API_KEY: str
     OPENROUTER_BASE_URL: str
     OPENROUTER_MODEL: str
+    OPENROUTER_TIMEOUT: float = 30.0  # Seconds per OpenRouter call
+
+    # Upstream Resilience Settings (Azure, OpenRouter, RxNav, 1mg)
+    RXNAV_BASE_URL: str = "https://rxnav.nlm.nih.gov/REST"
+    ONEMG_BASE_URL: str = "https://www.1mg.com"
+    RXNAV_TIMEOUT: float = 10.0  # Seconds per RxNav call
+    ONEMG_TIMEOUT: float = 5.0  # Seconds per 1mg call
+    ONEMG_MAX_BYTES: int = 8 * 1024  # Bytes of a 1mg search page read before the connection is closed
+    ONEMG_SPECULATIVE_AFTER: float = 1.5  # Seconds an RxNorm lookup may run before 1mg is queried in parallel (0 disables)
+    UPSTREAM_RETRY_ATTEMPTS: int = 3  # Attempts per call for connection errors, timeouts, 429 and 5xx
+    UPSTREAM_RETRY_BASE_DELAY: float = 0.5  # Backoff base; retry n waits up to base * 2^n (full jitter)
+    UPSTREAM_RETRY_MAX_DELAY: float = 4.0
+    UPSTREAM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open an upstream's breaker
+    UPSTREAM_BREAKER_RESET_SECONDS: float = 30.0  # Time an open breaker fails fast before probing again
+
+    # Startup Settings
+    WARMUP_ON_STARTUP: bool = True  # Import the pipeline and open upstream connections before serving
+    WARMUP_HTTP_TIMEOUT: float = 5.0  # Seconds allowed per upstream warm-up connection
+    HTTP_POOL_SIZE: int = 10  # Keep-alive connections per shared upstream session
+
+    # PDF Settings
+    PDF_MIN_PAGE_TEXT_CHARS: int = 20  # Pages with fewer text-layer characters are OCR'd
+
+    # Medicine Details Settings
+    DETAILS_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    DETAILS_CACHE_MAX_SIZE: int = 2048
+    DETAILS_HTTP_MAX_AGE: int = 24 * 60 * 60  # Cache-Control max-age for details endpoints
+    DETAILS_BULK_MAX: int = 50  # RxCUIs accepted per bulk details request
+    DETAILS_BULK_WORKERS: int = 4  # Concurrent RxNav lookups per bulk details request
+    INTERACTION_CACHE_MAX_SIZE: int = 10000  # RxCUI pairs kept by the prescription interaction check
+    CLINICAL_INFO_PATH: str = ""  # JSON clinical knowledge base; empty uses nlp/data/clinical_info.json
+
+    # Profiling Settings
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of pipeline runs to profile (0 disables sampling)
+    PROFILE_ADMIN_TOKEN: str = ""  # X-Profile-Token value that forces profiling and reads profiles
+    PROFILE_STORE_SIZE: int = 50  # Most recent profiles kept in memory
+    PROFILE_TOP_FUNCTIONS: int = 40  # Functions listed in each stored call-stack profile
+
+    # Memory Accounting Settings
+    MEMORY_TRACEMALLOC: bool = False  # Trace Python allocations to report per-stage peak bytes
+    MEMORY_TRACEMALLOC_FRAMES: int = 1
 
     # File Upload Settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: set = frozenset({".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".pdf"})
     UPLOAD_DIR: str = "temp_uploads"
+    BATCH_MAX_FILES: int = 50  # Files accepted per batch request, including zip members
+    BATCH_MAX_WORKERS: int = 4  # Files processed concurrently per batch request
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,54 @@
+"""
+Shared HTTP sessions for upstream APIs.
+
+One keep-alive session per upstream is reused by every pipeline run, so
+connections (and their TLS handshakes) outlive a single request and can be
+opened ahead of time by the startup warm-up.
+"""
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+from app.core.metrics import instrument_session
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(upstream: str) -> requests.Session:
+    """Return the process-wide session for an upstream, creating it on first use."""
+    session = _sessions.get(upstream)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(upstream)
+            if session is None:
+                session = instrument_session(requests.Session(), upstream)
+                adapter = HTTPAdapter(pool_connections=settings.HTTP_POOL_SIZE,
+                                      pool_maxsize=settings.HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[upstream] = session
+    return session
+
+
+def warm_connection(session: requests.Session, url: str, timeout: float) -> bool:
+    """
+    Open a pooled connection to an upstream so the first real call skips the handshake.
+
+    Args:
+        session: Session whose pool should hold the connection
+        url: Any URL on the upstream host; the response status is ignored
+        timeout: Seconds to wait for the connection
+
+    Returns:
+        bool: True if the host answered
+    """
+    try:
+        session.head(url, timeout=timeout, allow_redirects=False)
+        return True
+    except requests.RequestException as e:
+        print(f"Warm-up connection to {url} failed: {e}")
+        return False
@@ -0,0 +1,236 @@
+"""
+Prometheus metrics for the extraction pipeline and its upstream services.
+
+Exposed in Prometheus text format on /metrics. Stages also record memory
+use: RSS deltas always, and tracemalloc peaks when MEMORY_TRACEMALLOC is on.
+Both readings are process-wide, so they are only recorded for stages that ran
+while no other pipeline was in flight.
+"""
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from app.core.config import settings
+from app.core.profiling import record_http_time
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+STAGE_DURATION = Histogram(
+    "mediscan_stage_duration_seconds",
+    "Time spent in each extraction pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+UPSTREAM_REQUESTS = Counter(
+    "mediscan_upstream_requests_total",
+    "HTTP calls to upstream services by response status",
+    ["upstream", "status"]
+)
+UPSTREAM_DURATION = Histogram(
+    "mediscan_upstream_request_duration_seconds",
+    "Time until response headers for upstream HTTP calls",
+    ["upstream"],
+    buckets=STAGE_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "mediscan_cache_requests_total",
+    "Cache lookups by cache name and result",
+    ["cache", "result"]
+)
+PIPELINES_IN_FLIGHT = Gauge(
+    "mediscan_pipelines_in_flight",
+    "Extraction pipelines currently running"
+)
+STAGE_PEAK_MEMORY = Histogram(
+    "mediscan_stage_memory_peak_bytes",
+    "Peak Python heap allocated during each stage (tracemalloc)",
+    ["stage"],
+    buckets=tuple(2 ** power * 1024 * 1024 for power in range(0, 12))
+)
+STAGE_RSS_GROWTH = Histogram(
+    "mediscan_stage_rss_growth_bytes",
+    "Growth of resident set size across each stage run alone (shrinking counts as 0)",
+    ["stage"],
+    buckets=tuple(2 ** power * 1024 * 1024 for power in range(0, 12))
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "mediscan_upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 open, 2 half-open)",
+    ["upstream"]
+)
+IMAGES_REJECTED = Counter(
+    "mediscan_images_rejected_total",
+    "Uploaded images rejected by the quality gate before OCR, by reason",
+    ["reason"]
+)
+
+if settings.MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+    tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the high-water mark, the best available without /proc (KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+@dataclass
+class StageMeasurement:
+    """Duration and memory use of one stage within a pipeline run."""
+    stage: str
+    seconds: float
+    rss_delta_bytes: Optional[int] = None  # None when other pipelines overlapped the stage
+    peak_bytes: Optional[int] = None  # tracemalloc peak above the stage's starting allocation
+    _peak_seen: int = field(default=0, repr=False)
+
+
+_stage_report: ContextVar[Optional[List[StageMeasurement]]] = ContextVar("stage_report", default=None)
+_stage_stack: ContextVar[tuple] = ContextVar("stage_stack", default=())
+
+# Pipelines running now, and ever started; a stage saw no other pipeline if
+# at most one ran when it started and none started before it ended
+_pipelines_running = 0
+_pipelines_started = 0
+_pipelines_lock = threading.Lock()
+
+
+@contextmanager
+def track_pipeline():
+    """Count a running extraction pipeline, for PIPELINES_IN_FLIGHT and memory attribution."""
+    global _pipelines_running, _pipelines_started
+    with _pipelines_lock:
+        _pipelines_running += 1
+        _pipelines_started += 1
+    PIPELINES_IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        with _pipelines_lock:
+            _pipelines_running -= 1
+        PIPELINES_IN_FLIGHT.dec()
+
+
+def _pipelines_snapshot():
+    with _pipelines_lock:
+        return _pipelines_running, _pipelines_started
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Record the duration and memory use of a pipeline stage.
+
+    Memory is read process-wide, so it is recorded only when no other pipeline
+    overlapped the stage; otherwise the stage's rss_delta_bytes and peak_bytes stay None.
+    """
+    running, started = _pipelines_snapshot()
+    alone = running <= 1
+    tracing = alone and tracemalloc.is_tracing()
+    measurement = StageMeasurement(stage=stage, seconds=0.0)
+    stack_token = _stage_stack.set(_stage_stack.get() + (measurement,))
+
+    rss_start = current_rss_bytes() if alone else 0
+    if tracing:
+        traced_start, _ = tracemalloc.get_traced_memory()
+        # reset_peak() is process-wide; enclosing stages recover their peak via _peak_seen
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        _stage_stack.reset(stack_token)
+        running_now, started_now = _pipelines_snapshot()
+        alone = alone and running_now <= 1 and started_now == started
+
+        STAGE_DURATION.labels(stage).observe(measurement.seconds)
+        if alone:
+            measurement.rss_delta_bytes = current_rss_bytes() - rss_start
+            STAGE_RSS_GROWTH.labels(stage).observe(max(0, measurement.rss_delta_bytes))
+        if alone and tracing and tracemalloc.is_tracing():
+            _, traced_peak = tracemalloc.get_traced_memory()
+            traced_peak = max(traced_peak, measurement._peak_seen)
+            measurement.peak_bytes = max(0, traced_peak - traced_start)
+            STAGE_PEAK_MEMORY.labels(stage).observe(measurement.peak_bytes)
+            parents = _stage_stack.get()
+            if parents:
+                parents[-1]._peak_seen = max(parents[-1]._peak_seen, traced_peak)
+
+        report = _stage_report.get()
+        if report is not None:
+            report.append(measurement)
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value / (1024 * 1024):+.1f}MB" if value < 0 else f"{value / (1024 * 1024):.1f}MB"
+
+
+@contextmanager
+def report_stages():
+    """Collect the stages run inside this block and print their timings and memory use."""
+    measurements: List[StageMeasurement] = []
+    token = _stage_report.set(measurements)
+    try:
+        yield measurements
+    finally:
+        _stage_report.reset(token)
+        if measurements:
+            print("\nStage timings:")
+            for m in measurements:
+                print(f"   {m.stage:<16} {m.seconds:7.2f}s   "
+                      f"RSS {_format_bytes(m.rss_delta_bytes):>9}   peak {_format_bytes(m.peak_bytes):>9}")
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup as a hit or miss."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def instrument_session(session, upstream: str):
+    """Attach a response hook that counts and times calls made through a requests session."""
+    def hook(response, *args, **kwargs):
+        elapsed = response.elapsed.total_seconds()
+        UPSTREAM_REQUESTS.labels(upstream, str(response.status_code)).inc()
+        UPSTREAM_DURATION.labels(upstream).observe(elapsed)
+        record_http_time(elapsed)
+
+    session.hooks["response"].append(hook)
+    return session
+
+
+def record_upstream_failure(upstream: str, status: str):
+    """Count an upstream call that produced no response ("error") or was short-circuited."""
+    UPSTREAM_REQUESTS.labels(upstream, status).inc()
+
+
+def record_image_rejected(reason: str):
+    """Count an image turned away by the quality gate."""
+    IMAGES_REJECTED.labels(reason).inc()
+
+
+def render_metrics():
+    """Return the current metrics in Prometheus text format and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,195 @@
+"""
+Opt-in call-stack profiling of single extraction pipeline runs.
+
+A run is profiled when it is sampled (PROFILE_SAMPLE_RATE) or when the
+request carries the admin profiling token. Profiles are kept in a bounded
+in-memory store and retrieved by id through the admin API.
+
+On Python 3.12+ cProfile hooks sys.monitoring, which is process-wide: only
+one profiler can be active at a time, so a run that overlaps a profiled one
+is not profiled, and the stored stats also include frames of any other
+requests that ran in the process meanwhile.
+"""
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+
+@dataclass
+class PipelineProfile:
+    """Timing breakdown and call-stack statistics of one pipeline run."""
+    id: str
+    label: str
+    created_at: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    http_time: float = 0.0
+    http_calls: int = 0
+    other_wait_time: float = 0.0
+    stats: str = ""
+
+    def summary(self) -> Dict:
+        data = asdict(self)
+        data.pop("stats")
+        return data
+
+
+@dataclass
+class _HttpTimer:
+    """HTTP wait time of one profiled run, plus profilers of the worker threads it used."""
+    seconds: float = 0.0
+    calls: int = 0
+    thread_profilers: List[cProfile.Profile] = field(default_factory=list)
+    closed: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ProfileStore:
+    """Thread-safe store that keeps the most recent profiles."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._profiles: "OrderedDict[str, PipelineProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: PipelineProfile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[PipelineProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[PipelineProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+profile_store = ProfileStore(settings.PROFILE_STORE_SIZE)
+
+_http_timer: ContextVar[Optional[_HttpTimer]] = ContextVar("profile_http_timer", default=None)
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a request token against PROFILE_ADMIN_TOKEN."""
+    if not token or not settings.PROFILE_ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(token, settings.PROFILE_ADMIN_TOKEN)
+
+
+def should_profile(token: Optional[str] = None) -> bool:
+    """Decide whether to profile this run: admin token present, or sampled."""
+    if is_admin_token(token):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def record_http_time(seconds: float):
+    """Attribute time blocked on an HTTP response to the profile running in this context."""
+    timer = _http_timer.get()
+    if timer is not None:
+        with timer.lock:
+            timer.seconds += seconds
+            timer.calls += 1
+
+
+def _call_profiled(fn, *args, **kwargs):
+    timer = _http_timer.get()
+    if timer is None:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one profiler per process, and the pipeline's already sees this thread
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        with timer.lock:
+            # Workers still running when the profile was stored are left out of it
+            if not timer.closed:
+                timer.thread_profilers.append(profiler)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """
+    Submit `fn` to a thread pool in a copy of the caller's context.
+
+    Pool threads do not inherit context variables, so without this their HTTP
+    time and call stacks would be missing from the caller's pipeline profile.
+
+    Returns:
+        concurrent.futures.Future: As returned by executor.submit
+    """
+    context = copy_context()
+    return executor.submit(context.run, _call_profiled, fn, *args, **kwargs)
+
+
+@contextmanager
+def profile_pipeline(label: str):
+    """
+    Profile the enclosed block and store the result.
+
+    Yields:
+        PipelineProfile: Filled in and stored when the block exits, or None when
+        another profiler is already active in the process (Python 3.12+)
+    """
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        profiler.enable()
+    except ValueError:
+        print(f"Skipping pipeline profile of {label}: another profiled run is in progress")
+        yield None
+        return
+
+    profile = PipelineProfile(
+        id=uuid.uuid4().hex,
+        label=label,
+        created_at=datetime.now(timezone.utc).isoformat()
+    )
+    timer = _HttpTimer()
+    token = _http_timer.set(timer)
+    try:
+        yield profile
+    finally:
+        profiler.disable()
+        _http_timer.reset(token)
+        with timer.lock:
+            timer.closed = True
+
+        profile.wall_time = time.perf_counter() - wall_start
+        profile.cpu_time = time.thread_time() - cpu_start
+        profile.http_time = timer.seconds
+        profile.http_calls = timer.calls
+        # Sleeps, lock waits and I/O other than HTTP response waits
+        profile.other_wait_time = max(0.0, profile.wall_time - profile.cpu_time - profile.http_time)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        for thread_profiler in timer.thread_profilers:
+            stats.add(thread_profiler)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILE_TOP_FUNCTIONS)
+        profile.stats = stream.getvalue()
+
+        profile_store.add(profile)
+        print(f"Stored pipeline profile {profile.id}: wall {profile.wall_time:.2f}s, "
+              f"cpu {profile.cpu_time:.2f}s, http {profile.http_time:.2f}s ({profile.http_calls} calls)")
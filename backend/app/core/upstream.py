@@ -0,0 +1,245 @@
+"""
+Retry policy and circuit breakers shared by every upstream service.
+
+All calls to Azure, OpenRouter, RxNav and 1mg go through an UpstreamClient,
+which enforces a timeout, retries transient failures with exponential
+backoff and full jitter, and fails fast while the upstream's breaker is open
+so the pipeline can return degraded results in bounded time.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import requests
+
+from app.core.config import settings
+from app.core.http import get_session
+from app.core.metrics import UPSTREAM_CIRCUIT_STATE, record_upstream_failure
+
+# Statuses worth retrying; everything else is returned to the caller as is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when an upstream call produced no response after all retries."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised without calling the upstream while its circuit breaker is open."""
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently a failing upstream call is retried."""
+    attempts: int
+    base_delay: float
+    max_delay: float
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single probe through (half-open),
+    which closes the breaker on success and re-opens it on failure. A probe
+    that reports nothing within `reset_timeout` is replaced by a new one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        UPSTREAM_CIRCUIT_STATE.labels(name).set(0)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+            self.state = state
+            UPSTREAM_CIRCUIT_STATE.labels(self.name).set(self._STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            # _opened_at doubles as the start of the current probe while half-open
+            if now - self._opened_at >= self.reset_timeout:
+                self._opened_at = now
+                self._set_state(self.HALF_OPEN)
+                return True
+            # Open, or half-open with the probe still in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+class UpstreamClient:
+    """HTTP calls to one upstream with timeouts, retries and a circuit breaker."""
+
+    def __init__(self, name: str, session: requests.Session, timeout: float,
+                 policy: RetryPolicy, breaker: CircuitBreaker):
+        self.name = name
+        self.session = session
+        self.timeout = timeout
+        self.policy = policy
+        self.breaker = breaker
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        try:
+            return max(0.0, float(response.headers.get("Retry-After", 0)))
+        except ValueError:
+            return 0.0
+
+    def request(self, method: str, url: str, deadline: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying connection errors, timeouts and RETRY_STATUSES.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            deadline: Optional time.monotonic() value after which no attempt or
+                retry is started; per-attempt timeouts are capped to it
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response: The first non-retryable response, or the last
+            retryable one when attempts run out
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            UpstreamUnavailable: If no attempt produced a response
+        """
+        timeout = kwargs.pop("timeout", self.timeout)
+        last_error = None
+        response = None
+
+        for attempt in range(self.policy.attempts):
+            # Checked before allow(), which may hand out the half-open probe that must report back
+            attempt_timeout = timeout
+            if deadline is not None:
+                attempt_timeout = min(timeout, deadline - time.monotonic())
+                if attempt_timeout <= 0:
+                    break
+
+            if not self.breaker.allow():
+                record_upstream_failure(self.name, "circuit_open")
+                raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+            try:
+                response = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                response = None
+                self.breaker.record_failure()
+                record_upstream_failure(self.name, "error")
+                last_error = e
+                delay = self.policy.backoff(attempt)
+            except Exception:
+                # Not retried, but every outcome must reach the breaker
+                self.breaker.record_failure()
+                record_upstream_failure(self.name, "error")
+                raise
+            else:
+                # Throttling is not a fault of the upstream, so only 5xx trips the breaker
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = max(self.policy.backoff(attempt), self._retry_after(response))
+
+            if attempt + 1 >= self.policy.attempts:
+                break
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                break
+            if response is not None:
+                # Release the connection of a streamed response that will not be read
+                response.close()
+            print(f"{self.name} request failed ({last_error or response.status_code}), "
+                  f"retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+        if response is not None:
+            return response
+        raise UpstreamUnavailable(f"{self.name} request failed: {last_error or 'deadline exceeded'}")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+# Per-call timeout (seconds) for each upstream
+UPSTREAM_TIMEOUTS = {
+    "azure": lambda: settings.AZURE_READ_TIMEOUT,
+    "openrouter": lambda: settings.OPENROUTER_TIMEOUT,
+    "rxnav": lambda: settings.RXNAV_TIMEOUT,
+    "1mg": lambda: settings.ONEMG_TIMEOUT,
+}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an upstream."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.UPSTREAM_BREAKER_RESET_SECONDS
+            )
+        return _breakers[name]
+
+
+def get_upstream(name: str, session: Optional[requests.Session] = None) -> UpstreamClient:
+    """
+    Build a client for a named upstream.
+
+    Args:
+        name: "azure", "openrouter", "rxnav" or "1mg"
+        session: Session to send requests with; defaults to the shared session for `name`
+
+    Returns:
+        UpstreamClient: Sharing the upstream's process-wide circuit breaker
+    """
+    return UpstreamClient(
+        name,
+        session=session or get_session(name),
+        timeout=UPSTREAM_TIMEOUTS[name](),
+        policy=RetryPolicy(
+            attempts=settings.UPSTREAM_RETRY_ATTEMPTS,
+            base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=settings.UPSTREAM_RETRY_MAX_DELAY
+        ),
+        breaker=get_breaker(name)
+    )
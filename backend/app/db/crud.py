@@ -1,35 +1,56 @@
-from sqlalchemy.orm import Session
+import asyncio
+from typing import Dict
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User
 from app.schemas.user import UserCreate
 from app.services.auth import get_password_hash, verify_password
+from app.services.user_cache import invalidate_user
 
 
-def get_user_by_username_or_email(db: Session, identifier: str):
-    return db.query(User).filter(
-        (User.username == identifier) | (User.email == identifier)
-    ).first()
+async def get_user_by_username_or_email(db: AsyncSession, identifier: str):
+    result = await db.execute(
+        select(User).where(or_(User.username == identifier, User.email == identifier)).limit(1)
+    )
+    return result.scalars().first()
 
 
-def create_user(db: Session, user_in: UserCreate):
+async def create_user(db: AsyncSession, user_in: UserCreate):
     user = User(
         name=user_in.name,
         username=user_in.username,
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password)
+        # bcrypt is deliberately slow; keep it off the event loop
+        hashed_password=await asyncio.to_thread(get_password_hash, user_in.password)
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-def authenticate_user(db: Session, identifier: str, password: str):
-    user = get_user_by_username_or_email(db, identifier)
+async def authenticate_user(db: AsyncSession, identifier: str, password: str):
+    user = await get_user_by_username_or_email(db, identifier)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
-    # increment visits count
-    user.visits += 1
-    db.commit()
-    return user
\ No newline at end of file
+    # Visits are counted by the caller through the write-behind visit counter
+    invalidate_user(user.username, user.email)
+    return user
+
+
+async def add_visits(db: AsyncSession, counts: Dict[int, int]):
+    """Atomically add visit counts per user id in one transaction, then drop their cached snapshots"""
+    for user_id, count in counts.items():
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(visits=User.visits + count)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    result = await db.execute(select(User.username, User.email).where(User.id.in_(counts)))
+    for username, email in result.all():
+        invalidate_user(username, email)
@@ -1,24 +1,22 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.db.crud import get_user_by_username_or_email
 from app.schemas.user import TokenData
+from app.services.user_cache import cache_user, get_cached_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -32,7 +30,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = TokenData(sub=username)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_username_or_email(db, token_data.sub)
+
+    # Serve a cached snapshot when possible; visit flushes invalidate it, so visits lag by at most one flush
+    cached_user = get_cached_user(token_data.sub)
+    if cached_user is not None:
+        return cached_user
+
+    user = await get_user_by_username_or_email(db, token_data.sub)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return cache_user(token_data.sub, user)
\ No newline at end of file
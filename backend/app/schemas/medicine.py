@@ -1,7 +1,16 @@
+from enum import Enum
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 
+class ExtractionDepth(str, Enum):
+    """How far the extraction pipeline runs; each tier adds RxNav calls."""
+    NAMES = "names"  # Medicine names from the LLM only
+    VALIDATED = "validated"  # + RxNorm validation (RxCUI and match score)
+    DETAILS = "details"  # + RxNorm details, without drug interactions
+    FULL = "full"  # + drug interactions
+
+
 class ExtractedMedicine(BaseModel):
     original_name: str = Field(..., description="Original medicine name from OCR")
     matched_name: Optional[str] = Field(None, description="Matched medicine name")
@@ -9,13 +18,29 @@ class ExtractedMedicine(BaseModel):
     rxnorm_validated: bool = Field(False, description="Whether validated against RxNorm")
     rxcui: Optional[str] = Field(None, description="RxNorm concept unique identifier")
     rxnorm_score: float = Field(0.0, description="RxNorm validation score")
-    details: Dict[str, Any]
+    details: Optional[Dict[str, Any]] = Field(
+        None, description="Detailed RxNorm information; omitted when extraction skipped details"
+    )
 
 
 class MedicineExtractionResponse(BaseModel):
+    file_name: Optional[str] = Field(None, description="Source file name (batch extraction only)")
     success: bool
     message: str
     extracted_text: str = Field(..., description="Full extracted text from image")
     medicines: List[ExtractedMedicine] = Field(..., description="List of extracted medicines")
     processing_time: float = Field(..., description="Processing time in seconds")
-    total_medicines_found: int = Field(..., description="Number of successfully matched medicines")
\ No newline at end of file
+    total_medicines_found: int = Field(..., description="Number of successfully matched medicines")
+
+
+class MedicineDetailsResponse(BaseModel):
+    rxcui: str = Field(..., description="RxNorm concept unique identifier")
+    details: Dict[str, Any] = Field(..., description="Detailed RxNorm information")
+
+
+class MedicineDetailsBulkRequest(BaseModel):
+    rxcuis: List[str] = Field(..., min_length=1, description="RxNorm concept unique identifiers")
+
+
+class MedicineDetailsBulkResponse(BaseModel):
+    details: Dict[str, Dict[str, Any]] = Field(..., description="Detailed RxNorm information by RxCUI")
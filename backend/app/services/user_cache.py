@@ -0,0 +1,25 @@
+from typing import Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.schemas.user import UserOut
+
+# Token subject (username) -> user snapshot, so authenticated requests skip the user query
+user_cache = TTLCache("auth_user", settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(subject: str) -> Optional[UserOut]:
+    return user_cache.get(subject)
+
+
+def cache_user(subject: str, user) -> UserOut:
+    """Store a lightweight snapshot of a user row under its token subject and return it"""
+    snapshot = UserOut.model_validate(user)
+    user_cache.set(subject, snapshot)
+    return snapshot
+
+
+def invalidate_user(*identifiers: str):
+    """Drop cached snapshots for a user, by username and/or email, after the user changes"""
+    for identifier in identifiers:
+        if identifier:
+            user_cache.delete(identifier)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict
+from app.core.config import settings
+from app.db.crud import add_visits
+from app.db.session import SessionLocal
+
+
+class VisitCounter:
+    """
+    Write-behind visit counter.
+
+    Increments are aggregated in memory per user and flushed periodically by a
+    background task, one atomic `visits = visits + n` update per user, so the
+    request path never waits on a row update and concurrent requests cannot
+    lose counts. `stop()` lets a flush in progress finish, rather than
+    cancelling it mid-write, then flushes whatever is still pending.
+    """
+
+    def __init__(self, session_factory, flush_interval: float):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._task = None
+        self._stopping = None
+
+    def increment(self, user_id: int, count: int = 1):
+        with self._lock:
+            self._pending[user_id] += count
+
+    async def flush(self) -> int:
+        """Write pending counts to the database; returns the number of users updated"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return 0
+
+        try:
+            async with self.session_factory() as db:
+                await add_visits(db, pending)
+            return len(pending)
+        except Exception as e:
+            print(f"Warning: Could not flush visit counts, will retry: {e}")
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                for user_id, count in pending.items():
+                    self._pending[user_id] += count
+            return 0
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    def start(self):
+        """Start the periodic flush task on the running event loop"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Signal the loop instead of cancelling it, so a batch being written is not dropped
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+visit_counter = VisitCounter(SessionLocal, settings.VISIT_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,82 @@
+"""
+Startup warm-up, run by the application lifespan before the worker serves requests.
+
+Imports the extraction pipeline (cv2, numpy, pypdf), compiles the OCR
+correction patterns, loads the clinical knowledge base, builds the OCR backend
+and opens keep-alive connections to the upstream APIs, so none of that cost
+lands on the first request.
+"""
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from app.core.config import settings
+
+
+def _import_pipeline():
+    importlib.import_module("extract")
+
+
+def _compile_correction_patterns():
+    from nlp.corrections import OCRCorrector
+    OCRCorrector().compile_patterns()
+
+
+def _load_clinical_knowledge_base():
+    from nlp.clinical_info import clinical_knowledge_base
+    clinical_knowledge_base.load()
+
+
+def _build_ocr_backend():
+    from ocr.backends import get_ocr_backend
+    get_ocr_backend().is_available()
+
+
+def _open_upstream_connections():
+    from app.core.http import get_session, warm_connection
+
+    targets = [
+        (get_session("rxnav"), settings.RXNAV_BASE_URL),
+        (get_session("1mg"), settings.ONEMG_BASE_URL),
+    ]
+    if settings.OPENROUTER_BASE_URL:
+        targets.append((get_session("openrouter"), settings.OPENROUTER_BASE_URL))
+    if settings.AZURE_SUBSCRIPTION_KEY and settings.AZURE_ENDPOINT:
+        from ocr.azure_read import get_read_client
+        targets.append((get_read_client().session, settings.AZURE_ENDPOINT))
+
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        list(executor.map(
+            lambda target: warm_connection(target[0], target[1], settings.WARMUP_HTTP_TIMEOUT),
+            targets
+        ))
+
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    "imports": _import_pipeline,
+    "correction_patterns": _compile_correction_patterns,
+    "clinical_knowledge_base": _load_clinical_knowledge_base,
+    "ocr_backend": _build_ocr_backend,
+    "upstream_connections": _open_upstream_connections,
+}
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Run every warm-up step; a failing step is logged and skipped.
+
+    Returns:
+        dict: Seconds spent per step
+    """
+    timings = {}
+    for name, step in WARMUP_STEPS.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+        timings[name] = time.perf_counter() - start
+
+    print("Warm-up completed: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return timings
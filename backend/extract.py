@@ -1,100 +1,158 @@
 import os
 import time
 import json
-import gc  
-from ocr.preprocessing import process_image
-from ocr.recognition import recognize_text
+from ocr.preprocessing import load_image, process_image
+from ocr.thumbnail import make_thumbnail
+from ocr.document import crop_document
+from ocr.phash import fingerprint, ocr_text_index
+from ocr.quality import check_image_quality
+from ocr.backends import get_ocr_backend
 from ocr.pdf_extractor import extract_text_from_pdf
 from ocr.preprocessing import validate_image_for_api
 from nlp.corrections import OCRCorrector
 from nlp.rxnorm_validator import RxNormValidator
 from nlp.extractor import OpenRouterExtractor
 from nlp.rxnorm_details import RxNormDetailsValidator
+from app.core.metrics import report_stages, track_pipeline, track_stage
+from app.schemas.medicine import ExtractionDepth
+
+
+@track_pipeline()
+@report_stages()
+@track_stage("pipeline")
+def process_file(file_path, on_event=None, depth=ExtractionDepth.FULL, owner=None):
+    """
+    Process a single PDF or image file through the OCR pipeline.
+
+    Args:
+        file_path: Path to the PDF or image
+        on_event: Optional callback(event, payload) invoked at each stage boundary
+            with partial results: "ocr_text", "medicines_extracted",
+            "medicine_validated" (per medicine) and "medicine_details" (per medicine)
+        depth: ExtractionDepth tier; stages beyond it are skipped, so "names" makes
+            no RxNav calls and "validated" leaves details to be fetched on demand
+        owner: ID of the uploading user; OCR text is reused only across that user's
+            own near-duplicate images, and not at all when None
+
+    Returns:
+        tuple: (extracted text, detailed medicines), or (None, None) on failure
+
+    Raises:
+        ImageQualityError: If an image fails the quality gate
+    """
+    def emit(event, payload):
+        if on_event is not None:
+            on_event(event, payload)
 
-
-def process_file(file_path):
-    """Process a single PDF or image file through the OCR pipeline."""
     start_time = time.time()
     print(f"Processing: {file_path}")
     is_pdf = file_path.lower().endswith(".pdf")
 
     if is_pdf:
-        # PDF Handling: Directly extract text using pdf_extract
+        # PDF Handling: use the embedded text layer, OCR only scanned pages
         print("Detected PDF file. Skipping image preprocessing and correction.")
-        print("Step 2: Recognizing text from PDF with Azure OCR...")
-        final_text = extract_text_from_pdf(file_path)
-        # Force garbage collection after PDF processing
-        gc.collect()
+        print("Step 2: Extracting text from PDF (text layer, Azure OCR for scanned pages)...")
+        with track_stage("pdf_extract"):
+            final_text = extract_text_from_pdf(file_path)
 
     else:
-        # Step 1: Image preprocessing
-        print("Step 1: Enhancing image for OCR...")
-        enhanced_image = process_image(file_path)
-        if enhanced_image is None:
-            print(f"Error: Failed to process image {file_path}")
+        # Step 1: Load the image and look up earlier near-identical uploads
+        try:
+            image = load_image(file_path)
+        except Exception as e:
+            print(f"Error: {e}")
             return None, None
-        if not validate_image_for_api(enhanced_image):
-            print(f"Error: Processed image doesn't meet API requirements")
-            # Clean up enhanced_image before returning
+        thumbnail = make_thumbnail(image)
+        # Turn away unreadable images before any upstream call; raises ImageQualityError
+        with track_stage("quality_gate"):
+            check_image_quality(thumbnail, image.shape)
+        # Fingerprint the cropped sheet, so the background around it does not count
+        with track_stage("document_crop"):
+            sheet = crop_document(image)
+        recognized_text = None
+        if owner is not None:
+            with track_stage("image_hash"):
+                image_fingerprint = fingerprint(sheet)
+                recognized_text = ocr_text_index.get(image_fingerprint, owner)
+
+        if recognized_text:
+            print("Step 1-2: Near-duplicate of an earlier image, reusing its OCR text")
+        else:
+            # Step 1: Image preprocessing
+            print("Step 1: Enhancing image for OCR...")
+            with track_stage("preprocess"):
+                enhanced_image = process_image(sheet, crop=False)
+            if enhanced_image is None:
+                print(f"Error: Failed to process image {file_path}")
+                return None, None
+            if not validate_image_for_api(enhanced_image):
+                print(f"Error: Processed image doesn't meet API requirements")
+                return None, None
+
+            # Step 2: OCR Recognition
+            ocr_backend = get_ocr_backend()
+            print(f"Step 2: Recognizing text with {ocr_backend.name} OCR...")
+            with track_stage("ocr"):
+                recognized_text = ocr_backend.recognize(enhanced_image)
+
+            # Release the image buffer; it is not needed after OCR
             del enhanced_image
-            gc.collect()
-            return None, None
 
-        # Step 2: OCR Recognition
-        print("Step 2: Recognizing text with Azure OCR...")
-        recognized_text = recognize_text(enhanced_image)
+            if not recognized_text:
+                print(f"Error: Failed to recognize text in image {file_path}")
+                return None, None
+            if owner is not None:
+                ocr_text_index.add(image_fingerprint, recognized_text, owner)
 
-        # Delete enhanced_image as it's no longer needed
-        del enhanced_image
-        gc.collect()
-
-        if not recognized_text:
-            print(f"Error: Failed to recognize text in image {file_path}")
-            return None, None
+        # The original image is not needed once text has been recognized
+        del image, sheet
         print("after recognition:")
         print(recognized_text)
 
         # Step 3: OCR correction
         print("Step 3: Applying OCR corrections...")
         corrector = OCRCorrector()
-        final_text = corrector.correct_text(recognized_text)
+        with track_stage("correction"):
+            final_text = corrector.correct_text(recognized_text)
         print("after correction:")
         print(final_text)
 
-        # Clean up after correction
-        del recognized_text
-        del corrector
-        gc.collect()
+    emit("ocr_text", {"extracted_text": final_text})
 
     # Step 4: Medicine extraction using OpenRouter API
     print("Step 4: Extracting medicine names using OpenRouter API...")
     extractor = OpenRouterExtractor()
-    processed_results = extractor.extract_medicine_names(final_text)
+    with track_stage("llm"):
+        processed_results = extractor.extract_medicine_names(final_text)
     print(processed_results)
-
-    # Clean up extractor
-    del extractor
-    gc.collect()
+    emit("medicines_extracted", {"medicines": processed_results})
 
     # Step 5: Validate medicines with RxNorm API
-    print("Step 5: Validating medicines with RxNorm API...")
-    validator = RxNormValidator()
-    validated_medicines = validator.validate_medicines(processed_results)
-
-    # Clean up after validation
-    del processed_results
-    del validator
-    gc.collect()
+    if depth == ExtractionDepth.NAMES:
+        print("Step 5: Skipping RxNorm validation (names-only depth)")
+        validated_medicines = processed_results
+    else:
+        print("Step 5: Validating medicines with RxNorm API...")
+        validator = RxNormValidator()
+        with track_stage("rxnorm_validate"):
+            validated_medicines = validator.validate_medicines(
+                processed_results,
+                on_validated=lambda medicine: emit("medicine_validated", medicine)
+            )
 
     # Step 6: Get detailed medicine information
-    print("Step 6: Fetching detailed medicine information...")
-    details_validator = RxNormDetailsValidator()
-    detailed_medicines =  details_validator.validate_medicines_with_details(validated_medicines)
-
-    # Clean up after getting details
-    del validated_medicines
-    del details_validator
-    gc.collect()
+    if depth in (ExtractionDepth.DETAILS, ExtractionDepth.FULL):
+        print("Step 6: Fetching detailed medicine information...")
+        details_validator = RxNormDetailsValidator()
+        with track_stage("details"):
+            detailed_medicines = details_validator.validate_medicines_with_details(
+                validated_medicines,
+                on_details=lambda medicine: emit("medicine_details", medicine),
+                include_interactions=depth == ExtractionDepth.FULL
+            )
+    else:
+        print(f"Step 6: Skipping detailed medicine information ({depth.value} depth)")
+        detailed_medicines = validated_medicines
 
     # Print time taken
     elapsed_time = time.time() - start_time
@@ -115,7 +173,7 @@ def process_file(file_path):
         print(f"\n{idx + 1}. {status} {original} → {matched} ({score})")
 
         # RxNorm information
-        if medicine["matched"] and medicine["rxnorm_validated"]:
+        if medicine["matched"] and medicine.get("rxnorm_validated"):
             print(f"   ✓ Verified in RxNorm (RxCUI: {medicine['rxcui']}, Score: {medicine['rxnorm_score']:.1f}%)")
 
             # Print detailed information if available
@@ -150,7 +208,7 @@ def process_file(file_path):
                     ingredients = [ing['name'] for ing in comp['ingredients'][:3]]
                     print(f"   🧪 Ingredients: {', '.join(ingredients)}")
 
-        elif medicine["matched"]:
+        elif medicine["matched"] and "rxnorm_validated" in medicine:
             print(f"   ✗ Not found in RxNorm")
 
     return final_text, detailed_medicines
@@ -209,20 +267,9 @@ def main():
             print(f"- detailed_medicines.json: Complete medicine data with details")
             print(f"- medicine_summary.json: Clean summary of validated medicines")
 
-            # Clean up final variables
-            del summary
-            gc.collect()
-
         except Exception as e:
             print(f"Error saving results: {e}")
 
-        finally:
-            # Final cleanup
-            del text, medicines
-            gc.collect()
-
 
 if __name__ == "__main__":
     main()
-    # Final garbage collection at script end
-    gc.collect()
\ No newline at end of file
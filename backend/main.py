@@ -1,13 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.db.session import Base, engine
-from app.api import auth , medicine
+from app.api import auth , medicine, metrics, admin
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.services.visit_counter import visit_counter
+from app.services.warmup import warm_up
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="MediScan API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    if settings.DB_CREATE_SCHEMA:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    # Pay for imports, pattern compilation and TLS handshakes before the first request
+    if settings.WARMUP_ON_STARTUP:
+        await asyncio.to_thread(warm_up)
+    visit_counter.start()
+    yield
+    # Flush buffered visit counts before the worker exits
+    await visit_counter.stop()
+    await engine.dispose()
+
+
+app = FastAPI(title="MediScan API", lifespan=lifespan)
 origins = settings.FRONTEND_URL
 
 app.add_middleware(
@@ -19,4 +37,6 @@ app.add_middleware(
 )
 
 app.include_router(auth.router)
-app.include_router(medicine.router)
\ No newline at end of file
+app.include_router(medicine.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Clinical information (indications, side effects, mechanism of action) per ingredient.
+
+Entries are loaded once from a JSON data file and indexed by normalized
+ingredient name and by RxCUI, so lookups are dictionary hits rather than a
+scan over every known drug.
+"""
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+DEFAULT_DATA_PATH = Path(__file__).parent / "data" / "clinical_info.json"
+
+CLINICAL_FIELDS = ("indications", "contraindications", "side_effects", "mechanism_of_action")
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z\-]+")
+
+
+def normalize_ingredient(name: str) -> str:
+    """Lower-case an ingredient name and collapse whitespace."""
+    return " ".join(name.lower().split())
+
+
+def empty_clinical_info() -> Dict:
+    return {
+        'indications': [],
+        'contraindications': [],
+        'side_effects': [],
+        'mechanism_of_action': ''
+    }
+
+
+class ClinicalKnowledgeBase:
+    """Ingredient clinical information loaded lazily from a data file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._by_ingredient: Optional[Dict[str, Dict]] = None
+        self._by_rxcui: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """
+        Load and index the data file if it has not been loaded yet.
+
+        Returns:
+            int: Number of indexed ingredients
+        """
+        if self._by_ingredient is None:
+            with self._lock:
+                if self._by_ingredient is None:
+                    self._index(self._read_entries())
+        return len(self._by_ingredient)
+
+    def _read_entries(self):
+        """Entries of the data file; an unreadable file is logged once and yields none."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading clinical knowledge base {self.path}: {e}")
+            return []
+        if not isinstance(entries, list):
+            print(f"Error loading clinical knowledge base {self.path}: expected a list of entries")
+            return []
+        return entries
+
+    def _index(self, entries):
+        by_ingredient = {}
+        by_rxcui = {}
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not isinstance(entry.get("ingredient"), str):
+                print(f"Skipping clinical knowledge base entry {position}: no ingredient name")
+                continue
+            info = empty_clinical_info()
+            info.update({field: entry[field] for field in CLINICAL_FIELDS if field in entry})
+            by_ingredient[normalize_ingredient(entry["ingredient"])] = info
+            rxcuis = entry.get("rxcuis", [])
+            for rxcui in rxcuis if isinstance(rxcuis, list) else []:
+                by_rxcui[str(rxcui)] = info
+        self._by_rxcui = by_rxcui
+        # Published last: a non-None ingredient index means both indexes are ready
+        self._by_ingredient = by_ingredient
+
+    def _find(self, drug_name: str, rxcui: Optional[str]) -> Optional[Dict]:
+        self.load()
+        if rxcui and rxcui in self._by_rxcui:
+            return self._by_rxcui[rxcui]
+
+        name = normalize_ingredient(drug_name or "")
+        if name in self._by_ingredient:
+            return self._by_ingredient[name]
+        # Salts, strengths and dose forms follow the ingredient ("metoprolol succinate 50 MG")
+        for token in _TOKEN_PATTERN.findall(name):
+            if token in self._by_ingredient:
+                return self._by_ingredient[token]
+        return None
+
+    def lookup(self, drug_name: str, rxcui: Optional[str] = None) -> Dict:
+        """
+        Clinical information for an ingredient, by RxCUI first and then by name.
+
+        Args:
+            drug_name: Ingredient or drug name as returned by RxNorm
+            rxcui: Optional RxCUI of the drug or ingredient
+
+        Returns:
+            dict: indications, contraindications, side_effects and mechanism_of_action
+            (empty values when the drug is unknown)
+        """
+        info = self._find(drug_name, rxcui)
+        if info is None:
+            return empty_clinical_info()
+        # Callers get their own lists; the indexed entries are shared
+        return {key: list(value) if isinstance(value, list) else value for key, value in info.items()}
+
+
+clinical_knowledge_base = ClinicalKnowledgeBase(settings.CLINICAL_INFO_PATH or DEFAULT_DATA_PATH)
@@ -4,9 +4,38 @@ Built to complement medicine name matching functionality.
 """
 import re
 import unittest
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 
+@lru_cache(maxsize=None)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern:
+    """Compile a correction pattern once per process."""
+    return re.compile(pattern, flags)
+
+
+# Patterns preserved verbatim during correction
+DOSE_PATTERN = r'\b(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg|µg|IU|tablet[s]?|pill[s]?|capsule[s]?)\b'
+DATE_PATTERN = r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'
+TIME_PATTERN = r'\b\d{1,2}:\d{2}\s*(?:am|pm|AM|PM)?\b'
+
+# Medicine-specific OCR errors, applied before the general patterns
+MEDICINE_OCR_ERRORS = (
+    (r'rnq\b', 'mg'),  # Common medical OCR error
+    (r'rng\b', 'mg'),  # Another common medical OCR error
+    (r'5O', '50'),  # O/0 confusion
+    (r'lO', '10'),  # l/1 confusion
+    (r'\bl\b', '1'),  # Standalone 'l' to '1'
+    (r'\bO\b', '0'),  # Standalone 'O' to '0'
+)
+
+MEDICAL_CAPITALIZATIONS = {
+    r'\b(rx)\b': 'Rx',
+    r'\b(covid-19)\b': 'COVID-19',
+    r'\b(covid)\b': 'COVID',
+}
+
+
 class OCRCorrector:
     """Class for correcting OCR errors in medical text."""
 
@@ -60,6 +89,23 @@ class OCRCorrector:
             r'\bs\.?q\.?\b',  # Subcutaneous
         ]
 
+    def compile_patterns(self) -> int:
+        """
+        Compile every correction pattern ahead of the first request.
+
+        Returns:
+            Number of patterns compiled
+        """
+        patterns = [(DOSE_PATTERN, re.IGNORECASE), (DATE_PATTERN, 0), (TIME_PATTERN, 0),
+                    (r'([.!?] )', 0), (r'\s{2,}', 0), (r'\s+([.,;:!?])', 0)]
+        patterns += [(pattern, 0) for pattern, _ in MEDICINE_OCR_ERRORS]
+        patterns += [(pattern, 0) for pattern in self.common_ocr_errors]
+        patterns += [(pattern, 0) for pattern in self.medical_terms_patterns]
+        patterns += [(pattern, re.IGNORECASE) for pattern in MEDICAL_CAPITALIZATIONS]
+        for pattern, flags in patterns:
+            _compile(pattern, flags)
+        return len(patterns)
+
     def preserve_patterns(self, text: str) -> Tuple[str, Dict[str, str]]:
         """
         Preserve important patterns in text before correction.
@@ -73,29 +119,26 @@ class OCRCorrector:
         preserved_patterns = {}
 
         # Save numeric patterns with units (like 10mg, 100ml)
-        dose_pattern = r'\b(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg|µg|IU|tablet[s]?|pill[s]?|capsule[s]?)\b'
-        for idx, match in enumerate(re.finditer(dose_pattern, text, re.IGNORECASE)):
+        for idx, match in enumerate(_compile(DOSE_PATTERN, re.IGNORECASE).finditer(text)):
             placeholder = f"__DOSE_{idx}__"
             preserved_patterns[placeholder] = match.group(0)
             text = text.replace(match.group(0), placeholder)
 
         # Save date patterns
-        date_pattern = r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'
-        for idx, match in enumerate(re.finditer(date_pattern, text)):
+        for idx, match in enumerate(_compile(DATE_PATTERN).finditer(text)):
             placeholder = f"__DATE_{idx}__"
             preserved_patterns[placeholder] = match.group(0)
             text = text.replace(match.group(0), placeholder)
 
         # Save time patterns
-        time_pattern = r'\b\d{1,2}:\d{2}\s*(?:am|pm|AM|PM)?\b'
-        for idx, match in enumerate(re.finditer(time_pattern, text)):
+        for idx, match in enumerate(_compile(TIME_PATTERN).finditer(text)):
             placeholder = f"__TIME_{idx}__"
             preserved_patterns[placeholder] = match.group(0)
             text = text.replace(match.group(0), placeholder)
 
         # Save medical terms and abbreviations
         for term_idx, pattern in enumerate(self.medical_terms_patterns):
-            for match_idx, match in enumerate(re.finditer(pattern, text)):
+            for match_idx, match in enumerate(_compile(pattern).finditer(text)):
                 placeholder = f"__MEDTERM_{term_idx}_{match_idx}__"
                 preserved_patterns[placeholder] = match.group(0)
                 text = text.replace(match.group(0), placeholder)
@@ -113,16 +156,12 @@ class OCRCorrector:
             Text with common OCR errors fixed
         """
         # First handle specific medicine-related OCR errors
-        text = re.sub(r'rnq\b', 'mg', text)  # Common medical OCR error
-        text = re.sub(r'rng\b', 'mg', text)  # Another common medical OCR error
-        text = re.sub(r'5O', '50', text)  # O/0 confusion
-        text = re.sub(r'lO', '10', text)  # l/1 confusion
-        text = re.sub(r'\bl\b', '1', text)  # Standalone 'l' to '1'
-        text = re.sub(r'\bO\b', '0', text)  # Standalone 'O' to '0'
+        for error_pattern, fix in MEDICINE_OCR_ERRORS:
+            text = _compile(error_pattern).sub(fix, text)
 
         # Then apply the general patterns
         for error_pattern, fix in self.common_ocr_errors.items():
-            text = re.sub(error_pattern, fix, text)
+            text = _compile(error_pattern).sub(fix, text)
 
         return text
 
@@ -161,7 +200,7 @@ class OCRCorrector:
             if segment.strip():
                 # If segment is long, try to split on sentence boundaries
                 if len(segment) > 80:
-                    sentence_segments = re.split(r'([.!?] )', segment)
+                    sentence_segments = _compile(r'([.!?] )').split(segment)
                     # Reassemble with punctuation
                     processed_segments = []
                     for i in range(0, len(sentence_segments), 2):
@@ -244,20 +283,14 @@ class OCRCorrector:
             Post-processed text
         """
         # Fix double spaces
-        text = re.sub(r'\s{2,}', ' ', text)
+        text = _compile(r'\s{2,}').sub(' ', text)
 
         # Fix spacing around punctuation
-        text = re.sub(r'\s+([.,;:!?])', r'\1', text)
+        text = _compile(r'\s+([.,;:!?])').sub(r'\1', text)
 
         # Fix capitalization issues for common medical terms
-        medical_capitalizations = {
-            r'\b(rx)\b': 'Rx',
-            r'\b(covid-19)\b': 'COVID-19',
-            r'\b(covid)\b': 'COVID',
-        }
-
-        for pattern, replacement in medical_capitalizations.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        for pattern, replacement in MEDICAL_CAPITALIZATIONS.items():
+            text = _compile(pattern, re.IGNORECASE).sub(replacement, text)
 
         return text
 
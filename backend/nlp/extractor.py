@@ -1,7 +1,6 @@
 import json
-import requests
-import time
 from app.core.config import settings
+from app.core.upstream import UpstreamUnavailable, get_upstream
 
 # Constants
 DEFAULT_CONFIDENCE_SCORE = 95
@@ -16,6 +15,7 @@ class OpenRouterExtractor:
         self.api_key = settings.OPENROUTER_API_KEY
         self.endpoint = settings.OPENROUTER_BASE_URL
         self.model = settings.OPENROUTER_MODEL
+        self.upstream = get_upstream("openrouter")
         self.base_prompt = """
 Extract only valid medicine names along with their dosages from the given text.
 
@@ -38,7 +38,7 @@ Example output:
 Text to analyze is given below:
 """
 
-    def _make_request(self, prompt, retries=3, delay=2):
+    def _make_request(self, prompt):
         payload = {
             "model": self.model,
             "messages": [{"role": "user", "content": prompt}],
@@ -46,18 +46,21 @@ Text to analyze is given below:
             "temperature": 0.0
         }
 
-        for attempt in range(retries):
-            response = requests.post(
-                url=self.endpoint,
+        try:
+            response = self.upstream.post(
+                self.endpoint,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json",
                 },
                 data=json.dumps(payload)
             )
-            if response.status_code == 200:
-                return response
-            time.sleep(delay)
+        except UpstreamUnavailable as e:
+            print(f"OpenRouter request failed: {e}")
+            return None
+        if response.status_code == 200:
+            return response
+        print(f"OpenRouter returned {response.status_code}: {response.text[:200]}")
         return None
 
     def _truncate_text(self, text, max_tokens=MAX_TOKENS):
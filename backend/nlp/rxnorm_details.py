@@ -1,23 +1,50 @@
-import requests
+import copy
 import time
-from typing import Dict, List, Optional
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import track_stage
+from app.core.upstream import get_upstream
+from nlp.clinical_info import clinical_knowledge_base
+
+# Details per RxCUI, shared by the extraction pipeline and the details endpoints
+details_cache = TTLCache("rxnorm_details", settings.DETAILS_CACHE_MAX_SIZE, settings.DETAILS_CACHE_TTL_SECONDS)
+
+# Interaction descriptions per RxCUI pair; an empty list records a pair known not to interact
+interaction_cache = TTLCache("rxnav_interactions", settings.INTERACTION_CACHE_MAX_SIZE,
+                             settings.DETAILS_CACHE_TTL_SECONDS)
+
+# Descriptions kept per interacting pair
+MAX_PAIR_INTERACTIONS = 5
+
+
+def interaction_pair(rxcui_a: str, rxcui_b: str) -> Tuple[str, str]:
+    """Cache key for a pair of RxCUIs, independent of their order."""
+    return tuple(sorted((rxcui_a, rxcui_b)))
 
 
 class RxNormDetailsValidator:
     """Enhanced RxNorm validator that fetches detailed medicine information."""
 
     def __init__(self):
-        self.base_url = "https://rxnav.nlm.nih.gov/REST"
-        self.session = requests.Session()
+        self.base_url = settings.RXNAV_BASE_URL
+        self.rxnav = get_upstream("rxnav")
 
     def get_drug_interactions(self, rxcui: str) -> List[str]:
         """Get drug interactions for a given RxCUI."""
+        return self._fetch_drug_interactions(rxcui)[0]
+
+    def _fetch_drug_interactions(self, rxcui: str) -> Tuple[List[str], bool]:
+        """Drug interactions for a RxCUI, and whether RxNav answered successfully."""
         interactions = []
+        complete = False
         try:
             url = f"{self.base_url}/interaction/interaction.json?rxcui={rxcui}"
-            response = self.session.get(url, timeout=10)
+            response = self.rxnav.get(url)
 
             if response.status_code == 200:
+                complete = True
                 data = response.json()
                 if 'interactionTypeGroup' in data:
                     for group in data['interactionTypeGroup']:
@@ -31,18 +58,89 @@ class RxNormDetailsValidator:
             time.sleep(0.2)
         except Exception as e:
             print(f"Error fetching interactions for {rxcui}: {e}")
+            complete = False
+
+        return interactions, complete
+
+    def get_prescription_interactions(self, rxcuis: Iterable[str]) -> Dict[Tuple[str, str], List[str]]:
+        """
+        Check every pair of prescribed RxCUIs for interactions with one list query.
+
+        Pairs already in the interaction cache are not queried again; RxNav is
+        only called with the RxCUIs that belong to uncached pairs.
+
+        Args:
+            rxcuis: RxCUIs of the matched medicines on one prescription
+
+        Returns:
+            dict: Interaction descriptions per sorted RxCUI pair (pairs without
+            interactions map to an empty list)
+        """
+        unique_rxcuis = sorted(set(rxcuis))
+        pairs = [interaction_pair(a, b) for a, b in combinations(unique_rxcuis, 2)]
+
+        interactions = {}
+        missing = []
+        for pair in pairs:
+            cached = interaction_cache.get(pair)
+            if cached is None:
+                missing.append(pair)
+            else:
+                interactions[pair] = cached
+
+        if not missing:
+            return interactions
+
+        query_rxcuis = sorted({rxcui for pair in missing for rxcui in pair})
+        try:
+            url = f"{self.base_url}/interaction/list.json"
+            response = self.rxnav.get(url, params={"rxcuis": " ".join(query_rxcuis)})
+            response.raise_for_status()
+            found = self._parse_interaction_list(response.json())
+        except Exception as e:
+            print(f"Error checking interactions for {', '.join(query_rxcuis)}: {e}")
+            return interactions
+
+        # Only a successful query settles the missing pairs, including the ones without interactions
+        for pair in missing:
+            interactions[pair] = found.get(pair, [])
+            interaction_cache.set(pair, interactions[pair])
 
         return interactions
 
+    @staticmethod
+    def _parse_interaction_list(data: Dict) -> Dict[Tuple[str, str], List[str]]:
+        """Group descriptions from an interaction/list.json response by queried RxCUI pair."""
+        found = {}
+        for group in data.get('fullInteractionTypeGroup', []):
+            for interaction_type in group.get('fullInteractionType', []):
+                # minConcept holds the queried RxCUIs the interaction was found between
+                concept_rxcuis = [concept.get('rxcui') for concept in interaction_type.get('minConcept', [])]
+                if len(concept_rxcuis) != 2 or not all(concept_rxcuis):
+                    continue
+                descriptions = found.setdefault(interaction_pair(*concept_rxcuis), [])
+                for pair in interaction_type.get('interactionPair', []):
+                    desc = pair.get('description', '')
+                    if desc and desc not in descriptions and len(descriptions) < MAX_PAIR_INTERACTIONS:
+                        descriptions.append(desc)
+        return found
+
     def get_detailed_composition(self, rxcui: str) -> Dict:
         """Get detailed composition and strength information."""
+        return self._fetch_detailed_composition(rxcui)[0]
+
+    def _fetch_detailed_composition(self, rxcui: str) -> Tuple[Dict, bool]:
+        """Composition for a RxCUI, and whether every RxNav call for it succeeded."""
         composition = {}
+        complete = True
         try:
             # Get all properties
             url = f"{self.base_url}/rxcui/{rxcui}/allProperties.json?prop=all"
-            response = self.session.get(url, timeout=10)
+            response = self.rxnav.get(url)
 
-            if response.status_code == 200:
+            if response.status_code != 200:
+                complete = False
+            else:
                 data = response.json()
                 if 'propConceptGroup' in data and 'propConcept' in data['propConceptGroup']:
                     for prop in data['propConceptGroup']['propConcept']:
@@ -58,9 +156,11 @@ class RxNormDetailsValidator:
 
             # Get ingredients with strengths (limited to 20)
             ing_url = f"{self.base_url}/rxcui/{rxcui}/allrelated.json"
-            ing_response = self.session.get(ing_url, timeout=10)
+            ing_response = self.rxnav.get(ing_url)
 
-            if ing_response.status_code == 200:
+            if ing_response.status_code != 200:
+                complete = False
+            else:
                 ing_data = ing_response.json()
                 composition['ingredients'] = []
 
@@ -83,55 +183,37 @@ class RxNormDetailsValidator:
             time.sleep(0.2)
         except Exception as e:
             print(f"Error fetching composition for {rxcui}: {e}")
+            complete = False
 
-        return composition
+        return composition, complete
 
-    def get_clinical_info(self, drug_name: str) -> Dict:
-        """Get clinical information from external sources (simplified version)."""
-        # This is a placeholder for clinical info that would typically come from
-        # medical databases like DrugBank, FDA, or clinical references
-        clinical_info = {
-            'indications': [],
-            'contraindications': [],
-            'side_effects': [],
-            'mechanism_of_action': ''
-        }
+    def get_clinical_info(self, drug_name: str, rxcui: Optional[str] = None) -> Dict:
+        """Get clinical information for an ingredient from the clinical knowledge base."""
+        return clinical_knowledge_base.lookup(drug_name, rxcui)
 
-        # Basic mapping for common drugs (you can expand this or integrate with other APIs)
-        drug_mappings = {
-            'metoprolol': {
-                'indications': ['Hypertension', 'Heart failure', 'Angina', 'Post-myocardial infarction'],
-                'side_effects': ['Fatigue', 'Dizziness', 'Depression', 'Cold hands/feet', 'Slow heart rate'],
-                'mechanism_of_action': 'Selective beta-1 adrenergic receptor blocker'
-            },
-            'dorzolamide': {
-                'indications': ['Glaucoma', 'Ocular hypertension'],
-                'side_effects': ['Eye irritation', 'Bitter taste', 'Blurred vision', 'Eye pain'],
-                'mechanism_of_action': 'Carbonic anhydrase inhibitor - reduces aqueous humor production'
-            },
-            'cimetidine': {
-                'indications': ['Peptic ulcer', 'GERD', 'Heartburn', 'Zollinger-Ellison syndrome'],
-                'side_effects': ['Diarrhea', 'Dizziness', 'Drowsiness', 'Headache', 'Gynecomastia'],
-                'mechanism_of_action': 'H2 receptor antagonist - reduces stomach acid production'
-            },
-            'oxprenolol': {
-                'indications': ['Hypertension', 'Angina', 'Arrhythmias', 'Anxiety'],
-                'side_effects': ['Fatigue', 'Dizziness', 'Cold extremities', 'Sleep disturbances'],
-                'mechanism_of_action': 'Non-selective beta-adrenergic receptor blocker with ISA'
-            }
-        }
+    def get_medicine_details(self, rxcui: str, include_interactions: bool = True) -> Dict:
+        """Get detailed information about a medicine using its RxCUI (cached per RxCUI)."""
+        return self.fetch_medicine_details(rxcui, include_interactions)[0]
 
-        # Look for matches in drug name
-        drug_lower = drug_name.lower()
-        for key, info in drug_mappings.items():
-            if key in drug_lower:
-                clinical_info.update(info)
-                break
+    def fetch_medicine_details(self, rxcui: str, include_interactions: bool = True) -> Tuple[Dict, bool]:
+        """
+        Get detailed information about a medicine, reporting whether the lookup was complete.
 
-        return clinical_info
+        Only complete lookups, where every RxNav call succeeded, are cached;
+        partial results are returned but retried next time.
+
+        Args:
+            rxcui: RxCUI of the medicine
+            include_interactions: Also fetch the medicine's drug interactions
+
+        Returns:
+            tuple: (details, complete); the details are the caller's own copy
+        """
+        cache_key = (rxcui, include_interactions)
+        cached = details_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached), True
 
-    def get_medicine_details(self, rxcui: str) -> Dict:
-        """Get detailed information about a medicine using its RxCUI."""
         details = {
             'composition': {},
             'indications': [],
@@ -144,12 +226,16 @@ class RxNormDetailsValidator:
             'contraindications': []
         }
 
+        complete = True
+        ingredient_rxcuis = {}
         try:
             # Get basic properties
             props_url = f"{self.base_url}/rxcui/{rxcui}/properties.json"
-            props_response = self.session.get(props_url, timeout=10)
+            props_response = self.rxnav.get(props_url)
 
-            if props_response.status_code == 200:
+            if props_response.status_code != 200:
+                complete = False
+            else:
                 props_data = props_response.json()
                 if 'properties' in props_data and props_data['properties']:
                     prop = props_data['properties']
@@ -160,7 +246,8 @@ class RxNormDetailsValidator:
                     }
 
             # Get detailed composition
-            detailed_comp = self.get_detailed_composition(rxcui)
+            detailed_comp, composition_complete = self._fetch_detailed_composition(rxcui)
+            complete = complete and composition_complete
             details['composition'].update(detailed_comp)
 
             # Limit composition ingredients to 20
@@ -169,9 +256,11 @@ class RxNormDetailsValidator:
 
             # Get related concepts using allrelated endpoint
             related_url = f"{self.base_url}/rxcui/{rxcui}/allrelated.json"
-            related_response = self.session.get(related_url, timeout=10)
+            related_response = self.rxnav.get(related_url)
 
-            if related_response.status_code == 200:
+            if related_response.status_code != 200:
+                complete = False
+            else:
                 related_data = related_response.json()
                 if 'allRelatedGroup' in related_data and 'conceptGroup' in related_data['allRelatedGroup']:
                     concept_groups = related_data['allRelatedGroup']['conceptGroup']
@@ -200,17 +289,20 @@ class RxNormDetailsValidator:
                                             details['generic_names']) < 20:  # Generic ingredients
                                         if name not in details['generic_names']:
                                             details['generic_names'].append(name)
+                                            ingredient_rxcuis[name] = concept.get('rxcui')
                                     elif tty in ['DF']:  # Dosage forms
                                         if name not in details['dosage_forms']:
                                             details['dosage_forms'].append(name)
 
             # Get drug interactions
-            details['drug_interactions'] = self.get_drug_interactions(rxcui)
+            if include_interactions:
+                details['drug_interactions'], interactions_complete = self._fetch_drug_interactions(rxcui)
+                complete = complete and interactions_complete
 
-            # Get clinical information based on generic names
+            # Get clinical information based on generic names; the knowledge base is keyed by ingredient RxCUI
             if details['generic_names']:
                 main_ingredient = details['generic_names'][0]
-                clinical_info = self.get_clinical_info(main_ingredient)
+                clinical_info = self.get_clinical_info(main_ingredient, ingredient_rxcuis.get(main_ingredient))
                 details['indications'] = clinical_info.get('indications', [])
                 details['side_effects'] = clinical_info.get('side_effects', [])
                 details['mechanism_of_action'] = clinical_info.get('mechanism_of_action', '')
@@ -219,9 +311,11 @@ class RxNormDetailsValidator:
             # Try alternative approach for ingredients if empty (but still respect the 20 limit)
             if len(details['generic_names']) < 20:
                 ing_url = f"{self.base_url}/rxcui/{rxcui}/allProperties.json?prop=all"
-                ing_response = self.session.get(ing_url, timeout=10)
+                ing_response = self.rxnav.get(ing_url)
 
-                if ing_response.status_code == 200:
+                if ing_response.status_code != 200:
+                    complete = False
+                else:
                     ing_data = ing_response.json()
                     if 'propConceptGroup' in ing_data and 'propConcept' in ing_data['propConceptGroup']:
                         for prop in ing_data['propConceptGroup']['propConcept']:
@@ -246,26 +340,66 @@ class RxNormDetailsValidator:
             details['brand_names'] = details['brand_names'][:20]
             details['generic_names'] = details['generic_names'][:20]
 
+            # Only complete lookups are cached; partial results are retried next time
+            if complete:
+                details_cache.set(cache_key, copy.deepcopy(details))
+
         except Exception as e:
             print(f"Error fetching details for RxCUI {rxcui}: {e}")
+            complete = False
+
+        return details, complete
 
-        return details
+    def validate_medicines_with_details(self, medicines: List[Dict],
+                                        on_details: Optional[Callable[[Dict], None]] = None,
+                                        include_interactions: bool = True) -> List[Dict]:
+        """
+        Validate medicines and fetch detailed information for matched ones.
 
-    def validate_medicines_with_details(self, medicines: List[Dict]) -> List[Dict]:
-        """Validate medicines and fetch detailed information for matched ones."""
+        `on_details`, if given, receives each medicine as soon as its details are fetched.
+        When `include_interactions` is True, the matched medicines are checked against
+        each other in one prescription-wide query and each medicine's `drug_interactions`
+        lists the interactions with the other prescribed drugs.
+        """
         enhanced_medicines = []
 
+        prescription_interactions = {}
+        if include_interactions:
+            rxcuis = [medicine['rxcui'] for medicine in medicines
+                      if medicine.get('rxnorm_validated') and medicine.get('rxcui')]
+            with track_stage("interactions"):
+                prescription_interactions = self.get_prescription_interactions(rxcuis)
+
         for medicine in medicines:
             enhanced_medicine = medicine.copy()
 
             # If medicine was validated and has RxCUI, get details
             if medicine.get('rxnorm_validated') and medicine.get('rxcui'):
                 print(f"Fetching details for {medicine['original']}...")
-                details = self.get_medicine_details(medicine['rxcui'])
+                details = self.get_medicine_details(medicine['rxcui'], include_interactions=False)
+                if include_interactions:
+                    # Cached details are shared, so interactions go on a copy
+                    details = dict(details, drug_interactions=self._interactions_for(
+                        medicine['rxcui'], prescription_interactions
+                    ))
                 enhanced_medicine['details'] = details
             else:
                 enhanced_medicine['details'] = None
 
             enhanced_medicines.append(enhanced_medicine)
-
-        return enhanced_medicines
\ No newline at end of file
+            if on_details is not None:
+                on_details(enhanced_medicine)
+
+        return enhanced_medicines
+
+    @staticmethod
+    def _interactions_for(rxcui: str, prescription_interactions: Dict[Tuple[str, str], List[str]]) -> List[str]:
+        """Descriptions of the prescription's interactions that involve this RxCUI."""
+        descriptions = []
+        for pair, pair_descriptions in prescription_interactions.items():
+            if rxcui not in pair:
+                continue
+            for desc in pair_descriptions:
+                if desc not in descriptions:
+                    descriptions.append(desc)
+        return descriptions
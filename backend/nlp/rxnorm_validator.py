@@ -1,5 +1,11 @@
-import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from app.core.config import settings
+from app.core.profiling import submit_in_context
+from app.core.upstream import get_upstream
+
+# Pages with fewer bytes than this are treated as "no results" by the 1mg check
+ONEMG_MIN_CONTENT_BYTES = 500
 
 
 class RxNormValidator:
@@ -8,9 +14,11 @@ class RxNormValidator:
     Falls back to 1mg.com search when RxNorm validation fails.
     """
 
-    def __init__(self, base_url="https://rxnav.nlm.nih.gov/REST"):
-        self.base_url = base_url
+    def __init__(self, base_url=None):
+        self.base_url = base_url or settings.RXNAV_BASE_URL
         self.request_delay = 0.5  # Delay between requests to avoid rate limiting
+        self.rxnav = get_upstream("rxnav")
+        self.onemg = get_upstream("1mg")
 
     def validate_with_rxnorm(self, medicine_name):
         """
@@ -31,7 +39,7 @@ class RxNormValidator:
         url = f"{self.base_url}/approximateTerm.json?term={cleaned_name}"
 
         try:
-            response = requests.get(url)
+            response = self.rxnav.get(url)
             response.raise_for_status()  # Raise exception for HTTP errors
 
             # Add delay to avoid rate limiting
@@ -71,7 +79,7 @@ class RxNormValidator:
         # Clean medicine name for URL
         cleaned_name = medicine_name.strip().replace(" ", "+")
 
-        search_url = f"https://www.1mg.com/search/all?name={cleaned_name}"
+        search_url = f"{settings.ONEMG_BASE_URL}/search/all?name={cleaned_name}"
 
         try:
             # Add headers to mimic browser request
@@ -79,13 +87,20 @@ class RxNormValidator:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
 
-            response = requests.get(search_url, headers=headers)
+            # Only the start of the page is needed, so stream it and drop the connection early
+            with self.onemg.get(search_url, headers=headers, stream=True) as response:
+                content = b""
+                if response.status_code == 200:
+                    for chunk in response.iter_content(chunk_size=1024):
+                        content += chunk
+                        if len(content) >= settings.ONEMG_MAX_BYTES:
+                            break
 
             # Add delay to avoid rate limiting
             time.sleep(self.request_delay)
 
             # If page exists (HTTP 200) and has content, consider it validated
-            if response.status_code == 200 and len(response.text) > 500:  # Basic check for content
+            if response.status_code == 200 and len(content) > ONEMG_MIN_CONTENT_BYTES:  # Basic check for content
                 return {
                     "1mg_validated": True,
                     "1mg_url": search_url,
@@ -98,60 +113,108 @@ class RxNormValidator:
             print(f"1mg validation error for '{medicine_name}': {e}")
             return None
 
-    def validate_medicines(self, medicine_list):
+    def validate_name(self, medicine_name, executor=None):
+        """
+        Validate one name with RxNorm, falling back to 1mg.
+
+        With an executor and ONEMG_SPECULATIVE_AFTER set, the 1mg lookup starts in
+        parallel once RxNorm has been running that long, and its answer is used
+        only if RxNorm finds nothing.
+
+        Args:
+            medicine_name (str): The medicine name to validate
+            executor (ThreadPoolExecutor): Optional pool with at least two free workers
+
+        Returns:
+            tuple: (RxNorm info or None, 1mg info or None)
+        """
+        delay = settings.ONEMG_SPECULATIVE_AFTER
+        if executor is None or delay <= 0:
+            rxnorm_info = self.validate_with_rxnorm(medicine_name)
+            return rxnorm_info, None if rxnorm_info else self.validate_with_1mg(medicine_name)
+
+        rxnorm_future = submit_in_context(executor, self.validate_with_rxnorm, medicine_name)
+        onemg_future = None
+        try:
+            rxnorm_info = rxnorm_future.result(timeout=delay)
+        except FutureTimeoutError:
+            print(f"RxNorm slow for '{medicine_name}', querying 1mg in parallel...")
+            onemg_future = submit_in_context(executor, self.validate_with_1mg, medicine_name)
+            rxnorm_info = rxnorm_future.result()
+
+        if rxnorm_info:
+            if onemg_future is not None:
+                # Dropped if it has not started; a running lookup is bounded by its timeout and read limit
+                onemg_future.cancel()
+            return rxnorm_info, None
+        if onemg_future is None:
+            return None, self.validate_with_1mg(medicine_name)
+        return None, onemg_future.result()
+
+    def validate_medicines(self, medicine_list, on_validated=None):
         """
         Validates a list of medicine dictionaries against RxNorm database.
         Falls back to 1mg.com validation when RxNorm fails.
 
         Args:
             medicine_list (list): List of medicine dictionaries from previous processing
+            on_validated (callable): Optional callback receiving each medicine as soon as it is validated
 
         Returns:
             list: Enhanced list with RxNorm and fallback validation information
         """
         validated_list = []
+        # One worker for RxNorm plus one per name for 1mg, so a speculative 1mg lookup left
+        # running for an earlier name never delays a later one; threads start only when needed
+        matched_count = sum(1 for medicine in medicine_list if medicine["matched"])
+        executor = ThreadPoolExecutor(max_workers=max(2, matched_count + 1),
+                                      thread_name_prefix="rxnorm-validate")
 
-        for medicine in medicine_list:
-            # Store original medicine dict
-            validated_medicine = medicine.copy()
-
-            # Only validate if we have a matched medicine
-            if medicine["matched"]:
-                medicine_name = medicine["matched"]
-                rxnorm_info = self.validate_with_rxnorm(medicine_name)
-
-                if rxnorm_info:
-                    # Add RxNorm information to the medicine dict
-                    validated_medicine["rxnorm_validated"] = True
-                    validated_medicine["rxcui"] = rxnorm_info["rxcui"]
-                    validated_medicine["rxnorm_score"] = rxnorm_info["score"]
-                    validated_medicine["rxnorm_name"] = rxnorm_info["name"]
-                    validated_medicine["1mg_validated"] = False  # No need for 1mg validation
+        try:
+            for medicine in medicine_list:
+                # Store original medicine dict
+                validated_medicine = medicine.copy()
+
+                # Only validate if we have a matched medicine
+                if medicine["matched"]:
+                    medicine_name = medicine["matched"]
+                    rxnorm_info, mg_info = self.validate_name(medicine_name, executor)
+
+                    if rxnorm_info:
+                        # Add RxNorm information to the medicine dict
+                        validated_medicine["rxnorm_validated"] = True
+                        validated_medicine["rxcui"] = rxnorm_info["rxcui"]
+                        validated_medicine["rxnorm_score"] = rxnorm_info["score"]
+                        validated_medicine["rxnorm_name"] = rxnorm_info["name"]
+                        validated_medicine["1mg_validated"] = False  # No need for 1mg validation
+                    else:
+                        # RxNorm validation failed, try 1mg fallback
+                        validated_medicine["rxnorm_validated"] = False
+                        validated_medicine["rxcui"] = None
+                        validated_medicine["rxnorm_score"] = 0
+                        validated_medicine["rxnorm_name"] = None
+
+                        # 1mg validation as fallback
+                        if mg_info:
+                            # Add 1mg validation information
+                            validated_medicine["1mg_validated"] = True
+                            validated_medicine["1mg_url"] = mg_info["1mg_url"]
+                            validated_medicine["1mg_status_code"] = mg_info["1mg_status_code"]
+                        else:
+                            validated_medicine["1mg_validated"] = False
                 else:
-                    # RxNorm validation failed, try 1mg fallback
+                    # No matched medicine to validate
                     validated_medicine["rxnorm_validated"] = False
                     validated_medicine["rxcui"] = None
                     validated_medicine["rxnorm_score"] = 0
                     validated_medicine["rxnorm_name"] = None
-
-                    # Attempt 1mg validation as fallback
-                    mg_info = self.validate_with_1mg(medicine_name)
-
-                    if mg_info:
-                        # Add 1mg validation information
-                        validated_medicine["1mg_validated"] = True
-                        validated_medicine["1mg_url"] = mg_info["1mg_url"]
-                        validated_medicine["1mg_status_code"] = mg_info["1mg_status_code"]
-                    else:
-                        validated_medicine["1mg_validated"] = False
-            else:
-                # No matched medicine to validate
-                validated_medicine["rxnorm_validated"] = False
-                validated_medicine["rxcui"] = None
-                validated_medicine["rxnorm_score"] = 0
-                validated_medicine["rxnorm_name"] = None
-                validated_medicine["1mg_validated"] = False
-
-            validated_list.append(validated_medicine)
+                    validated_medicine["1mg_validated"] = False
+
+                validated_list.append(validated_medicine)
+                if on_validated is not None:
+                    on_validated(validated_medicine)
+        finally:
+            # Speculative 1mg lookups that are no longer needed finish in the background
+            executor.shutdown(wait=False)
 
         return validated_list
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+Shared client for the Azure Computer Vision Read API.
+
+Used by both image recognition and PDF extraction so that connections are
+kept alive across calls and polling adapts to how long Azure actually takes.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from app.core.config import settings
+from app.core.metrics import instrument_session, track_stage
+from app.core.upstream import get_upstream
+
+
+class AzureReadError(Exception):
+    """Raised when Azure Read rejects a document or the analysis fails."""
+
+
+class AzureReadTimeout(AzureReadError):
+    """Raised when an analysis does not complete within the call deadline."""
+
+
+@dataclass
+class ReadResult:
+    """Recognized lines per page together with polling statistics."""
+    pages: Dict[int, List[str]] = field(default_factory=dict)
+    polls: int = 0
+    wait_time: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line for number in sorted(self.pages) for line in self.pages[number])
+
+
+class AzureReadClient:
+    """Submits documents to Azure Read and polls for results with adaptive intervals."""
+
+    # Weight of the newest observation in the completion-time average
+    SMOOTHING = 0.3
+
+    def __init__(self, endpoint: str, subscription_key: str, timeout: float,
+                 min_poll_interval: float, max_poll_interval: float, pool_size: int = 10):
+        if not subscription_key or not endpoint:
+            raise ValueError("Azure subscription key and endpoint are required")
+
+        self.analyze_url = endpoint.rstrip("/") + "/vision/v3.2/read/analyze"
+        self.timeout = timeout
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+
+        self.session = instrument_session(requests.Session(), "azure")
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Ocp-Apim-Subscription-Key"] = subscription_key
+        # Retries, throttling (Retry-After) and the circuit breaker; capped by each call's deadline
+        self.upstream = get_upstream("azure", session=self.session)
+
+        # Observed completion time (seconds) per payload size bucket
+        self._completion_times: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size_bucket(size_bytes: int) -> int:
+        """Bucket payloads by powers of two above 64KB."""
+        if size_bytes <= 64 * 1024:
+            return 0
+        return int(math.log2(size_bytes / (64 * 1024))) + 1
+
+    def expected_completion(self, size_bytes: int) -> float:
+        """Expected seconds from submission to completion for a payload of this size."""
+        with self._lock:
+            return self._completion_times.get(self._size_bucket(size_bytes), self.min_poll_interval)
+
+    def _record_completion(self, size_bytes: int, seconds: float):
+        bucket = self._size_bucket(size_bytes)
+        with self._lock:
+            previous = self._completion_times.get(bucket)
+            if previous is None:
+                self._completion_times[bucket] = seconds
+            else:
+                self._completion_times[bucket] = previous + self.SMOOTHING * (seconds - previous)
+
+    def _next_poll_delay(self, expected: float, elapsed: float, overdue_polls: int) -> float:
+        """Sleep until the expected completion time, then back off geometrically."""
+        remaining = expected - elapsed
+        if remaining >= self.min_poll_interval:
+            return min(remaining, self.max_poll_interval)
+        return min(self.max_poll_interval, self.min_poll_interval * (2 ** overdue_polls))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _check_deadline(deadline: float, delay: float = 0.0):
+        if time.monotonic() + delay > deadline:
+            raise AzureReadTimeout("Azure Read did not complete before the deadline")
+
+    def analyze(self, data: bytes, content_type: str, timeout: Optional[float] = None) -> ReadResult:
+        """
+        Submit a document and wait for its Read result.
+
+        Args:
+            data: Encoded image or PDF bytes
+            content_type: MIME type sent to Azure
+            timeout: Hard deadline in seconds for submission plus polling
+
+        Returns:
+            ReadResult: Lines per page with poll count and time spent waiting
+
+        Raises:
+            AzureReadTimeout: If the deadline passes before the analysis completes
+            AzureReadError: If Azure rejects the request or the analysis fails
+            UpstreamUnavailable: If Azure cannot be reached or its circuit breaker is open
+        """
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        result = ReadResult()
+
+        # Step 1: Submit; throttled and failed submissions are retried within the deadline
+        with track_stage("ocr_submit"):
+            while True:
+                response = self.upstream.post(
+                    self.analyze_url,
+                    headers={"Content-Type": content_type},
+                    data=data,
+                    deadline=deadline
+                )
+                if response.status_code != 429:
+                    break
+                # The retry policy's attempts are spent, but throttling is waited out until the deadline
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self.upstream.policy.backoff(self.upstream.policy.attempts)
+                response.close()
+                self._check_deadline(deadline, delay)
+                print(f"Azure Read throttled, resubmitting in {delay:.2f}s")
+                time.sleep(delay)
+
+        if response.status_code != 202:
+            raise AzureReadError(f"{response.status_code} - {response.text}")
+
+        operation_location = response.headers["Operation-Location"]
+        expected = self.expected_completion(len(data))
+        retry_after = self._retry_after(response)
+        overdue_polls = 0
+
+        # Step 2: Poll until the analysis finishes or the deadline passes
+        with track_stage("ocr_poll"):
+            while True:
+                elapsed = time.monotonic() - start
+                if retry_after is not None:
+                    delay = retry_after
+                else:
+                    delay = self._next_poll_delay(expected, elapsed, overdue_polls)
+                    if elapsed + delay > expected:
+                        overdue_polls += 1
+                self._check_deadline(deadline, delay)
+                time.sleep(delay)
+                result.wait_time += delay
+
+                poll_response = self.upstream.get(operation_location, deadline=deadline)
+                result.polls += 1
+                retry_after = self._retry_after(poll_response)
+
+                if poll_response.status_code == 429 or poll_response.status_code >= 500:
+                    print(f"Error polling: {poll_response.status_code} - {poll_response.text}")
+                    continue
+                if poll_response.status_code != 200:
+                    raise AzureReadError(f"{poll_response.status_code} - {poll_response.text}")
+
+                analysis = poll_response.json()
+                status = analysis.get("status")
+                if status == "failed":
+                    raise AzureReadError(analysis.get("error", {}).get("message", "Analysis failed"))
+                if status == "succeeded":
+                    break
+
+        result.elapsed = time.monotonic() - start
+        self._record_completion(len(data), result.elapsed)
+
+        # Step 3: Collect lines per page
+        for page in analysis.get("analyzeResult", {}).get("readResults", []):
+            result.pages[page["page"]] = [line["text"] for line in page["lines"]]
+
+        print(f"Azure Read completed in {result.elapsed:.2f}s "
+              f"({result.polls} polls, {result.wait_time:.2f}s waiting)")
+        return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_read_client() -> AzureReadClient:
+    """Return the process-wide Azure Read client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AzureReadClient(
+                    endpoint=settings.AZURE_ENDPOINT,
+                    subscription_key=settings.AZURE_SUBSCRIPTION_KEY,
+                    timeout=settings.AZURE_READ_TIMEOUT,
+                    min_poll_interval=settings.AZURE_READ_MIN_POLL_INTERVAL,
+                    max_poll_interval=settings.AZURE_READ_MAX_POLL_INTERVAL,
+                    pool_size=settings.AZURE_READ_POOL_SIZE
+                )
+    return _client
@@ -0,0 +1,195 @@
+"""
+OCR backends that turn a preprocessed image into text.
+
+`process_file` dispatches through `get_ocr_backend()`, which is selected by
+the OCR_BACKEND setting:
+    - "azure": Azure Computer Vision Read (cloud)
+    - "tesseract": local CPU engine, no cloud call
+    - "auto": Azure, switching to Tesseract while Azure latency is high
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.core.config import settings
+from ocr.recognition import recognize_text
+
+
+class OCRBackend(ABC):
+    """Interface for OCR engines."""
+
+    name = "base"
+
+    def is_available(self) -> bool:
+        """Whether the engine can be used in this deployment."""
+        return True
+
+    def reads_pdf(self) -> bool:
+        """Whether scanned PDFs can be submitted as documents rather than as page images."""
+        return False
+
+    @abstractmethod
+    def recognize(self, image) -> Optional[str]:
+        """
+        Recognize text in an image.
+
+        Args:
+            image: Preprocessed image (numpy array, grayscale or BGR)
+
+        Returns:
+            str: Recognized text, or None if recognition failed
+        """
+
+
+class AzureOCRBackend(OCRBackend):
+    """Azure Computer Vision Read API."""
+
+    name = "azure"
+
+    def is_available(self) -> bool:
+        return bool(settings.AZURE_SUBSCRIPTION_KEY and settings.AZURE_ENDPOINT)
+
+    def reads_pdf(self) -> bool:
+        return True
+
+    def recognize(self, image) -> Optional[str]:
+        return recognize_text(image)
+
+
+class TesseractOCRBackend(OCRBackend):
+    """Local Tesseract engine via pytesseract; requires the tesseract binary."""
+
+    name = "tesseract"
+
+    def __init__(self, lang: str = "eng", config: str = "--oem 1 --psm 3"):
+        self.lang = lang
+        self.config = config
+        self._available = None
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                self._available = True
+            except Exception as e:
+                print(f"Tesseract OCR unavailable: {e}")
+                self._available = False
+        return self._available
+
+    def recognize(self, image) -> Optional[str]:
+        try:
+            import cv2
+            import pytesseract
+
+            # pytesseract expects RGB channel order for color arrays
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+            text = pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+            return text.strip()
+
+        except Exception as e:
+            print(f"Error during Tesseract recognition: {str(e)}")
+            return None
+
+
+class LatencyRoutedBackend(OCRBackend):
+    """
+    Uses the primary backend while its recent latency stays under a threshold,
+    otherwise the local fallback. The primary is probed periodically so the
+    router returns to it once latency recovers; one request claims each probe,
+    the others keep using the fallback until it returns.
+
+    Scanned PDFs go to the primary as documents only while its latency is under
+    the threshold. Those reads do not update the latency average, since one
+    multi-page read is not comparable with an image, and a failed read is not
+    retried with the fallback.
+    """
+
+    name = "auto"
+
+    # Weight of the newest observation in the latency average
+    SMOOTHING = 0.3
+
+    def __init__(self, primary: OCRBackend, fallback: OCRBackend,
+                 latency_threshold: float, probe_interval: float):
+        self.primary = primary
+        self.fallback = fallback
+        self.latency_threshold = latency_threshold
+        self.probe_interval = probe_interval
+        self.primary_latency = 0.0
+        self._last_primary_call = 0.0
+        self._lock = threading.Lock()
+
+    def _use_primary(self, probe: bool = True) -> bool:
+        if not self.primary.is_available():
+            return False
+        if not self.fallback.is_available():
+            return True
+        with self._lock:
+            if self.primary_latency <= self.latency_threshold:
+                return True
+            if not probe:
+                return False
+            now = time.monotonic()
+            if now - self._last_primary_call < self.probe_interval:
+                return False
+            # Claim the probe so concurrent requests do not all go to the slow primary
+            self._last_primary_call = now
+            return True
+
+    def _record_primary_latency(self, seconds: float):
+        with self._lock:
+            self._last_primary_call = time.monotonic()
+            if self.primary_latency == 0.0:
+                self.primary_latency = seconds
+            else:
+                self.primary_latency += self.SMOOTHING * (seconds - self.primary_latency)
+
+    def reads_pdf(self) -> bool:
+        return self.primary.reads_pdf() and self._use_primary(probe=False)
+
+    def recognize(self, image) -> Optional[str]:
+        if self._use_primary():
+            start = time.monotonic()
+            text = self.primary.recognize(image)
+            self._record_primary_latency(time.monotonic() - start)
+            if text or not self.fallback.is_available():
+                return text
+            print(f"{self.primary.name} OCR returned no text, retrying with {self.fallback.name}...")
+        else:
+            print(f"Routing to {self.fallback.name} OCR ({self.primary.name} latency "
+                  f"{self.primary_latency:.2f}s > {self.latency_threshold:.2f}s)")
+        return self.fallback.recognize(image)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_ocr_backend(name: str) -> OCRBackend:
+    """Build the backend named by the OCR_BACKEND setting."""
+    if name == "azure":
+        return AzureOCRBackend()
+    if name == "tesseract":
+        return TesseractOCRBackend(lang=settings.TESSERACT_LANG)
+    if name == "auto":
+        return LatencyRoutedBackend(
+            primary=AzureOCRBackend(),
+            fallback=TesseractOCRBackend(lang=settings.TESSERACT_LANG),
+            latency_threshold=settings.OCR_AZURE_LATENCY_THRESHOLD,
+            probe_interval=settings.OCR_AZURE_PROBE_INTERVAL
+        )
+    raise ValueError(f"Unknown OCR backend: {name}")
+
+
+def get_ocr_backend() -> OCRBackend:
+    """Return the process-wide OCR backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_ocr_backend(settings.OCR_BACKEND.lower())
+    return _backend
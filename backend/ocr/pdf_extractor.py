@@ -1,41 +1,203 @@
-import time
-import requests
+import io
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import cv2
+import numpy as np
+from pypdf import PdfReader, PdfWriter
 from app.core.config import settings
+from app.core.profiling import submit_in_context
+from app.core.upstream import UpstreamUnavailable
+from ocr.azure_read import get_read_client
+from ocr.backends import OCRBackend, get_ocr_backend
+from ocr.preprocessing import process_image
+
+
+def extract_text_layer(pdf_data: bytes) -> List[str]:
+    """
+    Read the embedded text layer of every page of a PDF.
+
+    Args:
+        pdf_data: Raw PDF bytes
+
+    Returns:
+        list: One entry per page; empty string for pages without a text layer
+    """
+    reader = PdfReader(io.BytesIO(pdf_data))
+    page_texts = []
+    for page_number, page in enumerate(reader.pages, start=1):
+        try:
+            page_texts.append((page.extract_text() or "").strip())
+        except Exception as e:
+            print(f"Warning: Could not read text layer of page {page_number}: {e}")
+            page_texts.append("")
+    return page_texts
+
+
+def has_usable_text(text: str) -> bool:
+    """Check whether a page's text layer carries enough characters to skip OCR."""
+    return len(re.sub(r"\s+", "", text or "")) >= settings.PDF_MIN_PAGE_TEXT_CHARS
+
+
+def format_page_ranges(page_numbers: List[int]) -> str:
+    """Format 1-based page numbers as a compact range string, e.g. "1-3,5"."""
+    ranges = []
+    for number in sorted(set(page_numbers)):
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def _read_pdf_with_azure(pdf_data: bytes) -> Dict[int, List[str]]:
+    """
+    Run Azure Read on a PDF document.
+
+    Returns:
+        dict: Page number (1-based, within the submitted document) -> recognized lines
+    """
+    return get_read_client().analyze(pdf_data, "application/pdf").pages
+
+
+class _PageRangeReader:
+    """Submits page ranges of one PDF as separate, concurrent Azure Read operations."""
+
+    def __init__(self, pdf_data: bytes):
+        self.reader = PdfReader(io.BytesIO(pdf_data))
+        # pypdf readers are not safe to share between threads
+        self.lock = threading.Lock()
+
+    def _build_document(self, page_numbers: List[int]) -> bytes:
+        """Write the given 1-based pages into a standalone PDF."""
+        writer = PdfWriter()
+        with self.lock:
+            for number in page_numbers:
+                writer.add_page(self.reader.pages[number - 1])
+            buffer = io.BytesIO()
+            writer.write(buffer)
+        return buffer.getvalue()
+
+    def read_range(self, page_numbers: List[int]) -> Dict[int, List[str]]:
+        """
+        Recognize a page range, splitting it in half and retrying if Azure fails on it.
+
+        Returns:
+            dict: Page number (1-based, within the original PDF) -> recognized lines
+        """
+        try:
+            sub_lines = _read_pdf_with_azure(self._build_document(page_numbers))
+            return {page_numbers[index - 1]: lines for index, lines in sub_lines.items()}
+        except UpstreamUnavailable:
+            # Azure is unreachable or its breaker is open; smaller ranges would fail the same way
+            raise
+        except Exception as e:
+            if len(page_numbers) == 1:
+                raise
+            middle = len(page_numbers) // 2
+            print(f"Warning: Azure Read failed for pages {format_page_ranges(page_numbers)}, "
+                  f"retrying as smaller ranges: {e}")
+            page_lines = self.read_range(page_numbers[:middle])
+            page_lines.update(self.read_range(page_numbers[middle:]))
+            return page_lines
+
+    def read_pages(self, page_numbers: List[int]) -> Dict[int, List[str]]:
+        """Recognize pages in concurrent ranges and merge the results by page number."""
+        chunk_size = max(1, settings.AZURE_PDF_PAGES_PER_REQUEST)
+        ranges = [page_numbers[i:i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+        workers = max(1, min(settings.AZURE_PDF_MAX_CONCURRENCY, len(ranges)))
+        print(f"Submitting {len(ranges)} page range(s) to Azure Read with {workers} worker(s)")
+
+        page_lines = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [submit_in_context(executor, self.read_range, page_range) for page_range in ranges]
+            for future in futures:
+                page_lines.update(future.result())
+        return page_lines
+
+
+def load_page_image(reader: PdfReader, page_number: int):
+    """
+    Decode the scan embedded in a PDF page; the largest image if there are several.
+
+    Returns:
+        numpy.ndarray: BGR page image, or None if the page holds no decodable image
+    """
+    page = reader.pages[page_number - 1]
+    images = []
+    for image_file in page.images:
+        image = cv2.imdecode(np.frombuffer(image_file.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            images.append(image)
+    if not images:
+        return None
+    return max(images, key=lambda image: image.shape[0] * image.shape[1])
+
+
+def recognize_page_images(pdf_data: bytes, page_numbers: List[int], backend: OCRBackend) -> Dict[int, List[str]]:
+    """
+    Recognize scanned pages one image at a time, for backends that cannot read PDFs.
+
+    Returns:
+        dict: Page number (1-based) -> recognized lines
+    """
+    reader = PdfReader(io.BytesIO(pdf_data))
+    page_lines = {}
+    for number in page_numbers:
+        image = load_page_image(reader, number)
+        if image is None:
+            print(f"Warning: Page {number} has no embedded scan to recognize")
+            continue
+        enhanced_image = process_image(image)
+        text = backend.recognize(enhanced_image) if enhanced_image is not None else None
+        page_lines[number] = text.splitlines() if text else []
+    return page_lines
+
+
+def recognize_scanned_pages(pdf_data: bytes, page_numbers: List[int]) -> Dict[int, List[str]]:
+    """Recognize pages with the configured OCR backend: as PDF ranges for Azure, as page images otherwise."""
+    backend = get_ocr_backend()
+    if backend.reads_pdf():
+        return _PageRangeReader(pdf_data).read_pages(page_numbers)
+    print(f"Recognizing page images with {backend.name} OCR...")
+    return recognize_page_images(pdf_data, page_numbers, backend)
+
+
 def extract_text_from_pdf(file_path: str) -> str:
-    subscription_key = settings.AZURE_SUBSCRIPTION_KEY
-    endpoint = settings.AZURE_ENDPOINT
-    analyze_url = endpoint + "vision/v3.2/read/analyze"
+    """
+    Extract text from a PDF, preferring the embedded text layer.
 
+    Digital PDFs (e.g. EMR exports) are read locally; only pages without a
+    usable text layer (scanned pages) are recognized with the configured OCR
+    backend: Azure Read gets concurrent page ranges, other backends the
+    page scans one by one.
+    """
     # Read PDF file
     with open(file_path, "rb") as f:
         pdf_data = f.read()
 
-    headers = {
-        "Ocp-Apim-Subscription-Key": subscription_key,
-        "Content-Type": "application/pdf"
-    }
-
-    # Step 1: Submit PDF for analysis
-    response = requests.post(analyze_url, headers=headers, data=pdf_data)
-    response.raise_for_status()
-    operation_url = response.headers["Operation-Location"]
-
-    # Step 2: Poll for results
-    while True:
-        result = requests.get(operation_url, headers={"Ocp-Apim-Subscription-Key": subscription_key})
-        result.raise_for_status()
-        status = result.json().get("status")
-        if status in ["succeeded", "failed"]:
-            break
-        time.sleep(1)
-
-    # Step 3: Extract and return text
-    if status == "succeeded":
-        result_json = result.json()
-        all_text = []
-        for page in result_json["analyzeResult"]["readResults"]:
-            for line in page["lines"]:
-                all_text.append(line["text"])
-        return "\n".join(all_text)
-    else:
-        raise Exception("Text extraction failed.")
+    try:
+        page_texts = extract_text_layer(pdf_data)
+    except Exception as e:
+        print(f"Warning: Could not read PDF text layer, falling back to OCR: {e}")
+        page_texts = []
+
+    if not page_texts:
+        if not get_ocr_backend().reads_pdf():
+            print("Error: PDF cannot be parsed and the OCR backend only reads images")
+            return ""
+        page_lines = _read_pdf_with_azure(pdf_data)
+        return "\n".join(line for number in sorted(page_lines) for line in page_lines[number])
+
+    scanned_pages = [number for number, text in enumerate(page_texts, start=1) if not has_usable_text(text)]
+    print(f"PDF has {len(page_texts)} pages, {len(scanned_pages)} without a usable text layer")
+
+    if scanned_pages:
+        print(f"Recognizing pages {format_page_ranges(scanned_pages)} with OCR...")
+        page_lines = recognize_scanned_pages(pdf_data, scanned_pages)
+        for number in scanned_pages:
+            page_texts[number - 1] = "\n".join(page_lines.get(number, []))
+
+    return "\n".join(text for text in page_texts if text)
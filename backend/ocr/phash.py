@@ -0,0 +1,278 @@
+"""
+Perceptual hashing of uploaded images and an index of OCR text by hash.
+
+The same paper prescription re-sent by its owner, through a messenger at
+another JPEG quality or resolution, yields nearly the same difference hash
+(dHash) of the ink on its cropped sheet. Earlier OCR text is found by Hamming
+distance, so such near-duplicates skip Azure OCR.
+
+A page-level hash cannot tell "Amoxicillin 250mg" from "Amoxicillin 500mg"
+on the same letterhead, so hash matches are confirmed pixel by pixel: each
+entry keeps the ink mask of its sheet at a resolution where text is about
+OCR_PHASH_SIGNATURE_TEXT_HEIGHT pixels tall, and the new sheet is binarized at exactly
+that size. Re-encoding moves stroke edges by a pixel; a changed digit or word
+adds or removes whole strokes, which shows up as unmatched ink in one tile.
+Copies with less than half the resolution of the stored sheet cannot show
+such a change reliably and are never matched.
+
+Entries are scoped to the user who uploaded them, so one user's text is
+never returned for another user's photo.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from ocr.thumbnail import make_thumbnail
+
+# Side of the dHash grid; the hash has HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Adaptive threshold used to binarize sheets into ink masks
+INK_BLOCK_SIZE = 31
+INK_OFFSET = 15
+
+# Side of the tiles unmatched ink is counted in, and how far (in pixels) a
+# stroke may move before it counts as unmatched
+SIGNATURE_TILE = 32
+SIGNATURE_TOLERANCE = 1
+
+# Largest relative difference in aspect ratio between two sheets that can match
+MAX_ASPECT_DIFFERENCE = 0.01
+
+# Largest factor a sheet is upscaled by, to build its signature or to compare against one
+MAX_UPSCALE = 2.0
+
+# Longest side the text height is estimated at; small print stays several pixels tall
+TEXT_HEIGHT_SAMPLE_SIDE = 2000
+
+
+@dataclass(frozen=True)
+class InkSignature:
+    """Ink mask of a sheet, stored as a 1-bit PNG, and its size in pixels."""
+    shape: Tuple[int, int]
+    png: bytes
+
+    def mask(self) -> np.ndarray:
+        return cv2.imdecode(np.frombuffer(self.png, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def perceptual_hash(gray) -> int:
+    """
+    Difference hash of a grayscale image.
+
+    Args:
+        gray: Single-channel image, typically the ink mask of a thumbnail
+
+    Returns:
+        int: HASH_BITS-bit hash; each bit says whether a pixel is brighter than its right neighbour
+    """
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def ink_mask(gray) -> np.ndarray:
+    """Binarize a grayscale sheet; ink is 255, paper 0."""
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV,
+                                 INK_BLOCK_SIZE, INK_OFFSET)
+
+
+def estimate_text_height(gray) -> Optional[float]:
+    """
+    Median height of glyph-sized connected components of the ink, in pixels of `gray`.
+
+    Returns:
+        float: Estimated text height, or None when no text-like components were found
+    """
+    scale = min(1.0, TEXT_HEIGHT_SAMPLE_SIDE / max(gray.shape[:2]))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink_mask(gray), connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    glyphs = heights[(heights >= 4) & (heights <= gray.shape[0] / 10) & (widths <= 4 * heights)]
+    if len(glyphs) < 10:
+        return None
+    return float(np.median(glyphs)) / scale
+
+
+def ink_difference(a: np.ndarray, b: np.ndarray) -> int:
+    """
+    Most ink in any SIGNATURE_TILE tile that the other mask lacks within SIGNATURE_TOLERANCE pixels.
+
+    Args:
+        a: Ink mask
+        b: Ink mask of the same shape
+
+    Returns:
+        int: Unmatched ink pixels, counted both ways, in the worst tile
+    """
+    kernel = np.ones((2 * SIGNATURE_TOLERANCE + 1,) * 2, np.uint8)
+    unmatched = cv2.bitwise_or(
+        cv2.bitwise_and(a, cv2.bitwise_not(cv2.dilate(b, kernel))),
+        cv2.bitwise_and(b, cv2.bitwise_not(cv2.dilate(a, kernel)))
+    )
+    height, width = unmatched.shape
+    rows, cols = -(-height // SIGNATURE_TILE), -(-width // SIGNATURE_TILE)
+    padded = np.zeros((rows * SIGNATURE_TILE, cols * SIGNATURE_TILE), np.uint32)
+    padded[:height, :width] = unmatched > 0
+    return int(padded.reshape(rows, SIGNATURE_TILE, cols, SIGNATURE_TILE).sum(axis=(1, 3)).max())
+
+
+class SheetFingerprint:
+    """
+    Perceptual hash of a cropped sheet for lookup, plus what is needed to confirm a match.
+
+    Holds the full-resolution grayscale sheet only while the pipeline runs; the
+    index stores the compact InkSignature from signature().
+    """
+
+    def __init__(self, sheet):
+        self.gray = sheet if sheet.ndim == 2 else cv2.cvtColor(sheet, cv2.COLOR_BGR2GRAY)
+        # Hash the ink rather than the gray levels; paper noise flips the bits of a blank area
+        self.hash = perceptual_hash(ink_mask(make_thumbnail(self.gray)))
+
+    def mask_at(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        Ink mask of this sheet resized to `shape`.
+
+        Returns:
+            numpy.ndarray: The mask, or None if the aspect ratios differ or this
+            sheet would have to be upscaled by more than MAX_UPSCALE
+        """
+        height, width = self.gray.shape
+        if abs((width / height) / (shape[1] / shape[0]) - 1) > MAX_ASPECT_DIFFERENCE:
+            return None
+        if shape[0] > height * MAX_UPSCALE:
+            return None
+        interpolation = cv2.INTER_AREA if shape[0] < height else cv2.INTER_LINEAR
+        return ink_mask(cv2.resize(self.gray, (shape[1], shape[0]), interpolation=interpolation))
+
+    def signature(self) -> InkSignature:
+        """Ink mask scaled so that text is OCR_PHASH_SIGNATURE_TEXT_HEIGHT pixels tall, within MAX_UPSCALE."""
+        height, width = self.gray.shape
+        text_height = estimate_text_height(self.gray)
+        if text_height is None:
+            scale = min(1.0, TEXT_HEIGHT_SAMPLE_SIDE / max(height, width))
+        else:
+            scale = min(MAX_UPSCALE, settings.OCR_PHASH_SIGNATURE_TEXT_HEIGHT / text_height)
+        shape = (max(1, round(height * scale)), max(1, round(width * scale)))
+        mask = self.mask_at(shape)
+        success, buffer = cv2.imencode(".png", mask, [cv2.IMWRITE_PNG_BILEVEL, 1, cv2.IMWRITE_PNG_COMPRESSION, 9])
+        if not success:
+            raise ValueError("Failed to encode ink signature")
+        return InkSignature(shape=shape, png=buffer.tobytes())
+
+
+def fingerprint(sheet) -> SheetFingerprint:
+    """Fingerprint a sheet cropped with crop_document (BGR or grayscale)."""
+    return SheetFingerprint(sheet)
+
+
+class PerceptualHashIndex:
+    """
+    Thread-safe LRU map from (owner, image fingerprint) to OCR text with near-match lookup.
+
+    Hashes are split into `bands` equal chunks and indexed per chunk and owner.
+    Two hashes within `max_distance` bits (< bands) must agree exactly on at
+    least one chunk, so only the owner's entries sharing a chunk are compared.
+    A candidate is returned only if no tile of its ink signature differs by
+    more than `max_ink_difference` pixels.
+    """
+
+    def __init__(self, name: str, max_size: int, max_distance: int,
+                 max_ink_difference: int, bands: int = 32):
+        if max_distance >= bands:
+            raise ValueError("max_distance must be smaller than the number of bands")
+        self.name = name
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.max_ink_difference = max_ink_difference
+        self.bands = bands
+        self.band_bits = HASH_BITS // bands
+        self._entries: "OrderedDict[Tuple[Hashable, int], Tuple[InkSignature, str]]" = OrderedDict()
+        self._buckets: List[Dict[Tuple[Hashable, int], Set[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def _band_keys(self, image_hash: int):
+        mask = (1 << self.band_bits) - 1
+        return [(image_hash >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def get(self, image: SheetFingerprint, owner: Hashable) -> Optional[str]:
+        """Return the text `owner` stored for the closest confirmed match, if any."""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(image.hash)):
+                candidates |= self._buckets[band].get((owner, key), set())
+            nearby = sorted(
+                (distance, candidate, self._entries[(owner, candidate)])
+                for candidate in candidates
+                if (distance := hamming_distance(candidate, image.hash)) <= self.max_distance
+            )
+
+        # Confirm outside the lock; binarizing a full-size sheet takes tens of milliseconds
+        match = None
+        for distance, candidate, (signature, text) in nearby:
+            mask = image.mask_at(signature.shape)
+            if mask is None:
+                continue
+            difference = ink_difference(signature.mask(), mask)
+            if difference <= self.max_ink_difference:
+                with self._lock:
+                    if (owner, candidate) in self._entries:
+                        self._entries.move_to_end((owner, candidate))
+                match = text
+                break
+            print(f"Perceptual hash candidate at distance {distance}/{HASH_BITS} rejected "
+                  f"({difference} unmatched ink pixels in one tile)")
+
+        record_cache(self.name, match is not None)
+        if match is not None:
+            print(f"Perceptual hash match at distance {distance}/{HASH_BITS}")
+        return match
+
+    def add(self, image: SheetFingerprint, text: str, owner: Hashable):
+        signature = image.signature()
+        entry_key = (owner, image.hash)
+        with self._lock:
+            if entry_key not in self._entries:
+                for band, key in enumerate(self._band_keys(image.hash)):
+                    self._buckets[band].setdefault((owner, key), set()).add(image.hash)
+            self._entries[entry_key] = (signature, text)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._remove_from_buckets(evicted)
+
+    def _remove_from_buckets(self, entry_key: Tuple[Hashable, int]):
+        owner, image_hash = entry_key
+        for band, key in enumerate(self._band_keys(image_hash)):
+            bucket = self._buckets[band].get((owner, key))
+            if bucket is not None:
+                bucket.discard(image_hash)
+                if not bucket:
+                    del self._buckets[band][(owner, key)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# OCR text of recent uploads, shared by all pipeline runs and keyed by uploader
+ocr_text_index = PerceptualHashIndex(
+    "ocr_phash",
+    max_size=settings.OCR_PHASH_CACHE_SIZE,
+    max_distance=settings.OCR_PHASH_MAX_DISTANCE,
+    max_ink_difference=settings.OCR_PHASH_MAX_INK_DIFFERENCE
+)
@@ -2,10 +2,20 @@ import cv2
 import numpy as np
 import os
 
+from ocr.document import crop_document
+
+
+def is_bilevel(image) -> bool:
+    """Whether a single-channel image holds only pure black and white, like the Otsu-binarized branch"""
+    return image.ndim == 2 and cv2.countNonZero(cv2.inRange(image, 1, 254)) == 0
+
 
 def get_file_size_mb(image_data):
-    """Get the file size of encoded image in MB"""
-    _, buffer = cv2.imencode(".jpg", image_data, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    """Get the file size of encoded image (grayscale or BGR) in MB, as a 1-bit PNG if it is bilevel"""
+    if is_bilevel(image_data):
+        _, buffer = cv2.imencode(".png", image_data, [cv2.IMWRITE_PNG_BILEVEL, 1, cv2.IMWRITE_PNG_COMPRESSION, 9])
+    else:
+        _, buffer = cv2.imencode(".jpg", image_data, [cv2.IMWRITE_JPEG_QUALITY, 85])
     return len(buffer.tobytes()) / (1024 * 1024)
 
 
@@ -66,29 +76,54 @@ def adaptive_resize_for_api(image, target_size_mb=3.5, min_dimension=800):
     return resized
 
 
-def process_image(image_path):
+def load_image(image_path):
+    """
+    Load an image file as a BGR array.
+
+    Args:
+        image_path (str): Path to the input image
+
+    Returns:
+        numpy.ndarray: Loaded image
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file cannot be decoded as an image
+    """
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Failed to load image: {image_path}")
+    return image
+
+
+def process_image(image, crop=True):
     """
     Process image for optimal OCR performance with Azure Read API.
     Now includes intelligent file size management for large images.
 
     Args:
-        image_path (str): Path to the input image
+        image: Path to the input image, or an image already loaded with load_image
+            (BGR or grayscale)
+        crop: Cut the prescription sheet out of the photo first; pass False when
+            the caller already did so with crop_document
 
     Returns:
-        numpy.ndarray: Enhanced image for OCR or None if processing fails
+        numpy.ndarray: Enhanced image for OCR or None if processing fails; single-channel
+        unless the high-contrast branch keeps color from a BGR input
     """
     try:
-        # Check if file exists
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image not found: {image_path}")
-
-        # Load image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Failed to load image: {image_path}")
+        if isinstance(image, str):
+            image = load_image(image)
 
         print(f"Original image size: {image.shape[1]}x{image.shape[0]}")
 
+        # Cut the sheet out of the photo so the size budget is spent on text, not background
+        if crop:
+            image = crop_document(image)
+
         # First, handle large images by resizing to meet API constraints
         image = adaptive_resize_for_api(image, target_size_mb=3.5, min_dimension=800)
         print(f"After size optimization: {image.shape[1]}x{image.shape[0]}")
@@ -106,7 +141,7 @@ def process_image(image_path):
             print(f"After dimension optimization: {new_width}x{new_height}")
 
         # Convert to grayscale for analysis
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
         # Check image quality metrics
         contrast = np.std(gray)
@@ -129,8 +164,16 @@ def process_image(image_path):
             binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
             binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
 
-            # Convert back to color
-            processed_image = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+            # Stay single-channel; a 3-channel copy would triple memory and encoding work
+            processed_image = binary
+
+        elif contrast > 40 and image.ndim == 2:  # High contrast grayscale image
+            print("Applying contrast enhancement for high contrast grayscale image...")
+
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(16, 16))
+            enhanced = clahe.apply(gray)
+            gaussian = cv2.GaussianBlur(enhanced, (0, 0), 2.0)
+            processed_image = cv2.addWeighted(enhanced, 1.5, gaussian, -0.5, 0)
 
         elif contrast > 40:  # High contrast image
             print("Applying color enhancement for high contrast image...")
@@ -161,8 +204,7 @@ def process_image(image_path):
             print("Applying minimal processing for good quality image...")
 
             # Light noise reduction only
-            denoised = cv2.fastNlMeansDenoising(gray, None, h=5, searchWindowSize=21, templateWindowSize=7)
-            processed_image = cv2.cvtColor(denoised, cv2.COLOR_GRAY2BGR)
+            processed_image = cv2.fastNlMeansDenoising(gray, None, h=5, searchWindowSize=21, templateWindowSize=7)
 
         # Final size check and compression if needed
         final_size = get_file_size_mb(processed_image)
@@ -189,7 +231,7 @@ def validate_image_for_api(image):
     Validate that the processed image meets API requirements.
 
     Args:
-        image: Processed image
+        image: Processed image (grayscale or BGR)
 
     Returns:
         bool: True if image meets requirements, False otherwise
@@ -213,5 +255,6 @@ def validate_image_for_api(image):
         print("Warning: Image dimensions too large")
         return False
 
-    print(f"✓ Image validation passed: {width}x{height}, {size_mb:.2f}MB")
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    print(f"✓ Image validation passed: {width}x{height}x{channels}, {size_mb:.2f}MB")
     return True
\ No newline at end of file
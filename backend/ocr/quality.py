@@ -0,0 +1,79 @@
+"""
+Cheap quality gate run on the grayscale thumbnail before any upstream call.
+
+Blurry, black, blank or thumbnail-sized photos never yield medicines, yet
+each one would cost an Azure Read call and an OpenRouter completion. These
+checks take a few milliseconds on the 512px thumbnail and turn such uploads
+away with a reason the client can show.
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import record_image_rejected
+
+# Gray level at which highlights count as blown out
+CLIPPED_LEVEL = 250
+
+
+class ImageQualityError(ValueError):
+    """Raised when an image is unlikely to produce any OCR text."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def assess_image_quality(thumbnail, original_shape: Tuple[int, ...]) -> Optional[ImageQualityError]:
+    """
+    Check resolution, exposure, text density and sharpness, cheapest first.
+
+    Args:
+        thumbnail: Single-channel thumbnail from make_thumbnail
+        original_shape: Shape of the full-size image
+
+    Returns:
+        ImageQualityError: Describing the first failed check, or None if the image looks readable
+    """
+    height, width = original_shape[:2]
+    if min(height, width) < settings.QUALITY_MIN_SIDE:
+        return ImageQualityError(
+            "resolution",
+            f"Image is too small ({width}x{height}); upload a photo at least "
+            f"{settings.QUALITY_MIN_SIDE}px on each side."
+        )
+
+    # Judge exposure by the extremes: a clean page is mostly white, so its mean says little about the ink
+    shadow, highlight = np.percentile(thumbnail, (0.1, 99))
+    if highlight < settings.QUALITY_MIN_HIGHLIGHT:
+        return ImageQualityError("underexposed", "Image is too dark to read; retake it in better light.")
+    if shadow > settings.QUALITY_MAX_SHADOW and highlight >= CLIPPED_LEVEL:
+        return ImageQualityError("overexposed", "Image is washed out; retake it without glare or flash.")
+
+    edge_density = float((cv2.Canny(thumbnail, 50, 150) > 0).mean())
+    if edge_density < settings.QUALITY_MIN_EDGE_DENSITY:
+        return ImageQualityError("no_text", "No text was found in the image; upload a photo of the prescription.")
+
+    sharpness = float(cv2.Laplacian(thumbnail, cv2.CV_64F).var())
+    if sharpness < settings.QUALITY_MIN_SHARPNESS:
+        return ImageQualityError("blurry", "Image is too blurry to read; hold the camera steady and retake it.")
+
+    return None
+
+
+def check_image_quality(thumbnail, original_shape: Tuple[int, ...]):
+    """
+    Raise if the image fails the quality gate; a no-op when the gate is disabled.
+
+    Raises:
+        ImageQualityError: With the failed check in `reason`
+    """
+    if not settings.QUALITY_GATE_ENABLED:
+        return
+    error = assess_image_quality(thumbnail, original_shape)
+    if error is not None:
+        record_image_rejected(error.reason)
+        print(f"Image rejected by quality gate ({error.reason}): {error}")
+        raise error
@@ -1,7 +1,7 @@
-import requests
-import time
 import cv2
-from app.core.config import settings
+from app.core.metrics import track_stage
+from ocr.azure_read import AzureReadTimeout, get_read_client
+from ocr.preprocessing import is_bilevel
 
 
 def get_optimal_jpeg_quality(image):
@@ -36,100 +36,62 @@ def get_optimal_jpeg_quality(image):
     return test_qualities[0]
 
 
-def recognize_text(image):
-    """
-    Send image to Azure Computer Vision API for OCR with dynamic quality optimization.
+def encode_image(image):
     """
-    subscription_key = settings.AZURE_SUBSCRIPTION_KEY
-    endpoint = settings.AZURE_ENDPOINT
-
-    if not subscription_key or not endpoint:
-        raise ValueError("Azure subscription key and endpoint are required")
-
-    # Ensure no trailing slash in endpoint
-    if endpoint.endswith('/'):
-        endpoint = endpoint[:-1]
+    Encode an image for upload in the most compact format for its content.
 
-    # Construct the API URL for Read operation
-    read_url = f"{endpoint}/vision/v3.2/read/analyze"
+    Binarized pages become 1-bit PNGs: lossless, and an order of magnitude
+    smaller than JPEG, which also blurs their hard edges. Continuous-tone
+    images stay JPEG at the quality picked by get_optimal_jpeg_quality.
 
-    # Set request headers
-    headers = {
-        'Ocp-Apim-Subscription-Key': subscription_key,
-        'Content-Type': 'application/octet-stream'
-    }
+    Args:
+        image: Preprocessed image (numpy array, grayscale or BGR)
 
-    try:
-        # Get optimal JPEG quality for this image
+    Returns:
+        tuple: (encoded bytes, format description)
+    """
+    if is_bilevel(image):
+        encode_param = [int(cv2.IMWRITE_PNG_BILEVEL), 1, int(cv2.IMWRITE_PNG_COMPRESSION), 9]
+        success, buffer = cv2.imencode(".png", image, encode_param)
+        description = "1-bit PNG"
+    else:
         optimal_quality = get_optimal_jpeg_quality(image)
-
-        # Encode image with optimal quality
         encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), optimal_quality]
         success, buffer = cv2.imencode(".jpg", image, encode_param)
-        if not success:
-            raise ValueError("Failed to encode image")
+        description = f"JPEG q{optimal_quality}"
+    if not success:
+        raise ValueError("Failed to encode image")
+    return buffer.tobytes(), description
 
-        image_bytes = buffer.tobytes()
+
+def recognize_text(image):
+    """
+    Send image to Azure Computer Vision API for OCR, encoded in the most compact format for its content.
+    """
+    try:
+        client = get_read_client()
+
+        with track_stage("encode"):
+            # Pick the output format by content: 1-bit PNG for binarized pages, JPEG otherwise
+            image_bytes, image_format = encode_image(image)
 
         # Final size check
         size_mb = len(image_bytes) / (1024 * 1024)
-        print(f"Sending image: {size_mb:.2f}MB")
+        print(f"Sending image: {size_mb:.2f}MB ({image_format})")
 
         if size_mb > 4.0:
             raise ValueError(f"Image size {size_mb:.2f}MB exceeds API limit of 4MB")
 
-        # Send the API request
+        # Submit and wait for the Read result
         print("Sending image to Azure...")
-        response = requests.post(read_url, headers=headers, data=image_bytes)
-
-        # Check for successful response
-        if response.status_code != 202:
-            print(f"Error: {response.status_code} - {response.text}")
-            return None
-
-        # Get the operation location
-        operation_location = response.headers["Operation-Location"]
-        print("Image sent successfully. Waiting for results...")
-
-        # Optimized polling - faster initial checks, then slower
-        analysis = {}
-        poll_intervals = [0.5, 1, 2, 3, 4, 5]  # Start fast, then slow down
-
-        for wait_time in poll_intervals:
-            time.sleep(wait_time)
-
-            # Get the analysis result
-            analysis_response = requests.get(operation_location, headers={
-                "Ocp-Apim-Subscription-Key": subscription_key
-            })
-
-            if analysis_response.status_code != 200:
-                print(f"Error polling: {analysis_response.status_code} - {analysis_response.text}")
-                continue
-
-            analysis = analysis_response.json()
-
-            if "status" in analysis:
-                if analysis["status"] == "succeeded":
-                    print("Text recognition completed successfully")
-                    break
-                elif analysis["status"] == "failed":
-                    print(f"Analysis failed: {analysis.get('error', {}).get('message', 'Unknown error')}")
-                    return None
-                elif analysis["status"] == "running":
-                    print("Still processing...")
-                    continue
-
-        # Extract text from the results
-        result_text = ""
-        if "analyzeResult" in analysis:
-            read_results = analysis["analyzeResult"]["readResults"]
-            for page in read_results:
-                for line in page["lines"]:
-                    result_text += line["text"] + "\n"
-
-        return result_text.strip()
+        result = client.analyze(image_bytes, "application/octet-stream")
+        print("Text recognition completed successfully")
+
+        return result.text.strip()
 
+    except AzureReadTimeout as e:
+        print(f"Error during recognition: Azure Read timed out: {str(e)}")
+        return None
     except Exception as e:
         print(f"Error during recognition: {str(e)}")
-        return None
\ No newline at end of file
+        return None
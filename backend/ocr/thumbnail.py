@@ -0,0 +1,31 @@
+"""
+Small grayscale copies of images for cheap analysis.
+
+Shared by the quality gate, document cropping and perceptual hashing, none of
+which need full resolution to make their decisions.
+"""
+import cv2
+
+# Longest side of the grayscale thumbnail used for hashing and quality checks
+THUMBNAIL_MAX_SIDE = 512
+
+
+def make_thumbnail(image, max_side=THUMBNAIL_MAX_SIDE):
+    """
+    Downscale an image to a small grayscale copy for cheap analysis.
+
+    Args:
+        image: Input image (numpy array, BGR or grayscale)
+        max_side: Longest side of the thumbnail
+
+    Returns:
+        numpy.ndarray: Single-channel thumbnail (never upscaled)
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
@@ -0,0 +1,67 @@
+"""
+Benchmark worker cold start.
+
+Each run starts a fresh interpreter that imports `main` and then runs the
+application lifespan startup (schema creation, warm-up), timing both phases
+and listing which heavy modules were loaded by the import alone.
+
+Usage (from backend/, with the usual environment / .env in place):
+    python scripts/bench_startup.py --runs 5
+    python scripts/bench_startup.py --runs 5 --no-warmup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("cv2", "numpy", "pypdf", "extract")
+
+RUN_ONCE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+import_time = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+
+async def startup():
+    async with main.lifespan(main.app):
+        return time.perf_counter()
+
+start = time.perf_counter()
+ready = asyncio.run(startup())
+print(json.dumps({{"import": import_time, "startup": ready - start, "loaded": loaded}}))
+"""
+
+
+def run_once(warmup: bool) -> dict:
+    env = dict(os.environ, WARMUP_ON_STARTUP=str(warmup).lower())
+    completed = subprocess.run(
+        [sys.executable, "-c", RUN_ONCE.format(heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # The app logs with print; the measurement is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MediScan API cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--no-warmup", action="store_true", help="Disable the lifespan warm-up")
+    args = parser.parse_args()
+
+    results = [run_once(not args.no_warmup) for _ in range(args.runs)]
+    import_times = [result["import"] for result in results]
+    startup_times = [result["startup"] for result in results]
+
+    print(f"Runs: {args.runs} (warm-up {'off' if args.no_warmup else 'on'})")
+    print(f"import main:      median {statistics.median(import_times):.3f}s, max {max(import_times):.3f}s")
+    print(f"lifespan startup: median {statistics.median(startup_times):.3f}s, max {max(startup_times):.3f}s")
+    print(f"Heavy modules loaded by import: {', '.join(results[0]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+End-to-end load test of /medicine/extract against simulated upstreams.
+
+Starts local stand-ins for Azure Read (submit + Operation-Location polling),
+OpenRouter chat completions, the RxNav endpoints the validators use and the
+1mg search page, points the settings at them, serves the app with uvicorn
+and drives /medicine/extract with an open-loop request rate. Latency is
+measured from each request's scheduled start, so queueing inside the client
+counts against the service instead of hiding it.
+
+Each stand-in takes a log-normal latency ("MEDIAN" or "MEDIAN:SIGMA" seconds)
+and an error rate (fraction of calls answered with 5xx).
+
+Usage (from backend/):
+    python scripts/load_test.py --rps 2 --duration 60
+    python scripts/load_test.py --rps 5 --duration 30 --azure-latency 1.5:0.6 --rxnav-error-rate 0.05
+"""
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDICINES = ["Paracetamol 500mg", "Amoxicillin 250mg", "Metoprolol 50mg", "Cimetidine 200mg", "Dolo 650"]
+
+
+class Upstream:
+    """Latency distribution, error rate and call counters of one stand-in server."""
+
+    def __init__(self, name: str, latency: str, error_rate: float):
+        median, _, sigma = latency.partition(":")
+        self.name = name
+        self.median = float(median)
+        self.sigma = float(sigma or 0.5)
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+    def should_fail(self) -> bool:
+        fail = random.random() < self.error_rate
+        with self._lock:
+            self.calls += 1
+            self.errors += fail
+        return fail
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    upstream: Upstream = None
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status: int, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_HEAD(self):
+        self.send_json(200)
+
+
+class AzureHandler(StandInHandler):
+    """Read v3.2: submit returns 202 and the operation completes after the sampled latency."""
+
+    operations = {}
+    operation_ids = itertools.count()
+
+    def do_POST(self):
+        self.read_body()
+        if self.upstream.should_fail():
+            return self.send_json(503, {"error": {"message": "simulated outage"}})
+        operation_id = str(next(self.operation_ids))
+        self.operations[operation_id] = time.monotonic() + self.upstream.sample_latency()
+        host = self.headers["Host"]
+        self.send_json(202, headers={"Operation-Location": f"http://{host}/vision/v3.2/read/analyzeResults/{operation_id}"})
+
+    def do_GET(self):
+        ready_at = self.operations.get(self.path.rsplit("/", 1)[-1])
+        if ready_at is None:
+            return self.send_json(404, {"error": {"message": "unknown operation"}})
+        if time.monotonic() < ready_at:
+            return self.send_json(200, {"status": "running"})
+        lines = [{"text": "Dr. Load Test Clinic"}] + [{"text": name} for name in MEDICINES]
+        self.send_json(200, {"status": "succeeded", "analyzeResult": {"readResults": [{"page": 1, "lines": lines}]}})
+
+
+class OpenRouterHandler(StandInHandler):
+    """Chat completions answering with the medicines found in the prompt."""
+
+    def do_POST(self):
+        prompt = json.loads(self.read_body())["messages"][0]["content"]
+        time.sleep(self.upstream.sample_latency())
+        if self.upstream.should_fail():
+            return self.send_json(502, {"error": "simulated outage"})
+        found = [{"name": name, "position": f"line {index + 2}"}
+                 for index, name in enumerate(MEDICINES) if name in prompt]
+        self.send_json(200, {"choices": [{"message": {"content": json.dumps(found)}}]})
+
+
+def fake_rxcui(term: str) -> str:
+    return str(int(hashlib.md5(term.lower().encode()).hexdigest()[:6], 16))
+
+
+class RxNavHandler(StandInHandler):
+    """approximateTerm, properties, allProperties, allrelated and interaction lookups."""
+
+    def do_GET(self):
+        time.sleep(self.upstream.sample_latency())
+        if self.upstream.should_fail():
+            return self.send_json(503, {"error": "simulated outage"})
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/approximateTerm.json"):
+            term = query.get("term", [""])[0]
+            # Brand names are unknown to RxNorm, which exercises the 1mg fallback
+            candidates = [] if term.startswith("Dolo") else [
+                {"rxcui": fake_rxcui(term), "score": "100", "name": term.lower()}
+            ]
+            return self.send_json(200, {"approximateGroup": {"candidate": candidates}})
+        if url.path.endswith("/interaction/list.json"):
+            rxcuis = query.get("rxcuis", [""])[0].split()
+            interactions = [{
+                "minConcept": [{"rxcui": a}, {"rxcui": b}],
+                "interactionPair": [{"description": f"Simulated interaction between {a} and {b}."}]
+            } for a, b in zip(rxcuis, rxcuis[1:])]
+            return self.send_json(200, {"fullInteractionTypeGroup": [{"fullInteractionType": interactions}]})
+        if url.path.endswith("/interaction/interaction.json"):
+            return self.send_json(200, {})
+
+        match = re.search(r"/rxcui/(\d+)/(\w+)\.json$", url.path)
+        if not match:
+            return self.send_json(404, {})
+        rxcui, resource = match.groups()
+        if resource == "properties":
+            return self.send_json(200, {"properties": {"name": f"drug {rxcui}", "synonym": "", "tty": "SCD"}})
+        if resource == "allProperties":
+            return self.send_json(200, {"propConceptGroup": {"propConcept": [
+                {"propName": "RxNorm Name", "propValue": f"drug {rxcui}"}
+            ]}})
+        return self.send_json(200, {"allRelatedGroup": {"conceptGroup": [
+            {"tty": "IN", "conceptProperties": [{"name": f"ingredient {rxcui}", "rxcui": rxcui}]},
+            {"tty": "BN", "conceptProperties": [{"name": f"Brand {rxcui}", "rxcui": rxcui}]},
+        ]}})
+
+
+class OneMgHandler(StandInHandler):
+    """Search result page large enough to count as a hit."""
+
+    def do_GET(self):
+        time.sleep(self.upstream.sample_latency())
+        if self.upstream.should_fail():
+            return self.send_json(503, {"error": "simulated outage"})
+        body = b"<html><body>" + b"<div class='result'>product</div>" * 200 + b"</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stand_in(handler_class, upstream: Upstream) -> str:
+    handler = type(handler_class.__name__, (handler_class,), {"upstream": upstream})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def sample_image() -> bytes:
+    """A prescription-like PNG listing the stand-in medicines."""
+    import cv2
+    import numpy as np
+
+    image = np.full((1400, 1000, 3), 255, dtype=np.uint8)
+    for index, line in enumerate(["Dr. Load Test Clinic"] + MEDICINES):
+        cv2.putText(image, line, (60, 120 + index * 110), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (20, 20, 20), 3)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test /medicine/extract against simulated upstreams")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Client-side concurrency limit")
+    parser.add_argument("--port", type=int, default=8077, help="Port for the app under test")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite database")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's log output")
+    for name, latency in (("azure", "0.8"), ("openrouter", "1.2"), ("rxnav", "0.15"), ("1mg", "0.3")):
+        parser.add_argument(f"--{name}-latency", default=latency, help=f"{name} latency MEDIAN[:SIGMA] seconds")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help=f"Fraction of {name} calls failing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    upstreams = {
+        name: Upstream(name, getattr(args, f"{name}_latency"), getattr(args, f"{name}_error_rate"))
+        for name in ("azure", "openrouter", "rxnav", "1mg")
+    }
+    azure_url = start_stand_in(AzureHandler, upstreams["azure"])
+    openrouter_url = start_stand_in(OpenRouterHandler, upstreams["openrouter"])
+    rxnav_url = start_stand_in(RxNavHandler, upstreams["rxnav"])
+    onemg_url = start_stand_in(OneMgHandler, upstreams["1mg"])
+
+    # Settings are read when the app is imported, so point them at the stand-ins first
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='mediscan-load-')}/load.db"
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "OCR_BACKEND": "azure",
+        "AZURE_ENDPOINT": azure_url,
+        "AZURE_SUBSCRIPTION_KEY": "load-test",
+        "OPENROUTER_BASE_URL": openrouter_url,
+        "RXNAV_BASE_URL": rxnav_url + "/REST",
+        "ONEMG_BASE_URL": onemg_url,
+    })
+    for key, value in (("FRONTEND_URL", '["*"]'), ("SECRET_KEY", "load-test"), ("ALGORITHM", "HS256"),
+                       ("OPENROUTER_API_KEY", "load-test"), ("OPENROUTER_MODEL", "load-test")):
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import requests
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    credentials = {"username": f"load{random.randrange(10 ** 6)}", "password": "load-test-password"}
+    requests.post(f"{base_url}/auth/signup", json=dict(credentials, name="Load Test",
+                                                      email=f"{credentials['username']}@example.com"))
+    token = requests.post(f"{base_url}/auth/login", data=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    image = sample_image()
+
+    sessions = threading.local()
+    latencies = []
+    statuses = Counter()
+    results_lock = threading.Lock()
+
+    def send(scheduled_at: float):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        try:
+            response = sessions.session.post(f"{base_url}/medicine/extract", headers=headers,
+                                             files={"file": ("prescription.png", image, "image/png")}, timeout=300)
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        with results_lock:
+            latencies.append(time.monotonic() - scheduled_at)
+            statuses[status] += 1
+
+    total = int(args.rps * args.duration)
+    print(f"Sending {total} requests at {args.rps} rps to {base_url}/medicine/extract ...", file=sys.stderr)
+    log_target = contextlib.nullcontext() if args.verbose else open(os.devnull, "w")
+    with log_target as devnull, contextlib.redirect_stdout(devnull or sys.stdout):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+            for index in range(total):
+                scheduled_at = start + index / args.rps
+                time.sleep(max(0.0, scheduled_at - time.monotonic()))
+                executor.submit(send, scheduled_at)
+        elapsed = time.monotonic() - start
+    server.should_exit = True
+
+    latencies.sort()
+    completed = sum(statuses.values())
+    failed = completed - statuses.get("200", 0)
+    print(f"\nRequests:   {completed} completed in {elapsed:.1f}s (target {args.rps} rps)")
+    print(f"Throughput: {completed / elapsed:.2f} rps")
+    print(f"Latency:    p50 {percentile(latencies, 0.50):.2f}s, p95 {percentile(latencies, 0.95):.2f}s, "
+          f"p99 {percentile(latencies, 0.99):.2f}s, max {latencies[-1] if latencies else float('nan'):.2f}s")
+    print(f"Errors:     {failed} ({100.0 * failed / max(completed, 1):.1f}%)")
+    print("Statuses:   " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    print("Upstreams:  " + ", ".join(f"{upstream.name} {upstream.calls} calls ({upstream.errors} failed)"
+                                     for upstream in upstreams.values()))
+
+
+if __name__ == "__main__":
+    main()
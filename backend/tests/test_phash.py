@@ -0,0 +1,126 @@
+"""
+Near-duplicate OCR reuse on phone-photo sized images.
+
+A synthetic A4 prescription is rendered at 300 dpi and "photographed" onto a
+4000x3000 frame with perspective, blur, sensor noise and JPEG compression,
+then looked up in a PerceptualHashIndex the way extract.process_file does.
+
+Besides the lookup result, each case asserts how far its ink difference is
+from OCR_PHASH_MAX_INK_DIFFERENCE, so a tweak to the threshold or to the
+preprocessing cannot quietly move a case to the other side.
+"""
+import unittest
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from ocr.document import crop_document
+from ocr.phash import PerceptualHashIndex, fingerprint, ink_difference
+
+PRESCRIPTION = [
+    "City Clinic - Dr. A. Kumar MBBS",
+    "Patient: {patient}   Age: 42",
+    "Date: 12/03/2026",
+    "Rx",
+    "1. Amoxicillin 500mg - 1 cap TDS x 5 days",
+    "2. Paracetamol 500mg - 1 tab SOS",
+    "3. Amlodipine {amlodipine} OD",
+    "4. Pantoprazole 40mg - before breakfast",
+    "Review after one week",
+]
+
+
+def render_page(patient="Jane Smith", amlodipine="5mg"):
+    """Render the prescription as a 2480x3508 grayscale page (A4 at 300 dpi, ~9pt text)."""
+    page = np.full((3508, 2480), 250, np.uint8)
+    for index, line in enumerate(PRESCRIPTION):
+        text = line.format(patient=patient, amlodipine=amlodipine)
+        cv2.putText(page, text, (180, 250 + index * 176), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 20, 4, cv2.LINE_AA)
+    return page
+
+
+def photograph(page, seed=0):
+    """Place `page` on a table in a 4000x3000 phone photo, slightly tilted, and JPEG it."""
+    rng = np.random.default_rng(seed)
+    height, width = page.shape
+    table = cv2.GaussianBlur(rng.normal(90, 12, (3000, 4000, 3)).clip(0, 255).astype(np.uint8), (9, 9), 0)
+    transform = cv2.getPerspectiveTransform(
+        np.float32([[0, 0], [width, 0], [width, height], [0, height]]),
+        np.float32([[1200, 300], [3000, 380], [3080, 2750], [1150, 2700]])
+    )
+    sheet = cv2.warpPerspective(cv2.cvtColor(page, cv2.COLOR_GRAY2BGR), transform, (4000, 3000))
+    paper = cv2.warpPerspective(np.full(page.shape, 255, np.uint8), transform, (4000, 3000))
+    photo = cv2.GaussianBlur(np.where(paper[..., None] > 128, sheet, table), (3, 3), 0)
+    photo = (photo + rng.normal(0, 3, photo.shape)).clip(0, 255).astype(np.uint8)
+    return recompress(photo, 92)
+
+
+def recompress(image, quality, scale=1.0):
+    """Re-encode `image` the way a messenger would."""
+    if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+# Smallest distance from the threshold: copies must stay this far below it, changes further above
+MATCH_MARGIN = 5
+CHANGE_MARGIN = 10
+
+
+def sheet_fingerprint(photo):
+    return fingerprint(crop_document(photo))
+
+
+class PerceptualHashIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original = photograph(render_page())
+        cls.signature = sheet_fingerprint(cls.original).signature()
+
+    def setUp(self):
+        self.index = PerceptualHashIndex(
+            "test_phash",
+            max_size=10,
+            max_distance=settings.OCR_PHASH_MAX_DISTANCE,
+            max_ink_difference=settings.OCR_PHASH_MAX_INK_DIFFERENCE
+        )
+        self.index.add(sheet_fingerprint(self.original), "original text", owner=1)
+
+    def assert_matches(self, photo):
+        image = sheet_fingerprint(photo)
+        difference = ink_difference(self.signature.mask(), image.mask_at(self.signature.shape))
+        self.assertLessEqual(difference, settings.OCR_PHASH_MAX_INK_DIFFERENCE - MATCH_MARGIN)
+        self.assertEqual(self.index.get(image, owner=1), "original text")
+
+    def assert_rejected(self, photo):
+        image = sheet_fingerprint(photo)
+        difference = ink_difference(self.signature.mask(), image.mask_at(self.signature.shape))
+        self.assertGreaterEqual(difference, settings.OCR_PHASH_MAX_INK_DIFFERENCE + CHANGE_MARGIN)
+        self.assertIsNone(self.index.get(image, owner=1))
+
+    def test_recompressed_copy_matches(self):
+        self.assert_matches(recompress(self.original, 60))
+
+    def test_downscaled_copy_matches(self):
+        self.assert_matches(recompress(self.original, 70, scale=0.75))
+
+    def test_copy_with_different_sensor_noise_matches(self):
+        self.assert_matches(photograph(render_page(), seed=5))
+
+    def test_changed_digit_is_rejected(self):
+        self.assert_rejected(photograph(render_page(amlodipine="8mg")))
+
+    def test_changed_digit_in_recompressed_copy_is_rejected(self):
+        self.assert_rejected(recompress(photograph(render_page(amlodipine="6mg")), 70, scale=0.75))
+
+    def test_changed_word_is_rejected(self):
+        self.assert_rejected(photograph(render_page(patient="Jane Brown")))
+
+    def test_other_owner_misses(self):
+        self.assertIsNone(self.index.get(sheet_fingerprint(self.original), owner=2))
+
+
+if __name__ == "__main__":
+    unittest.main()